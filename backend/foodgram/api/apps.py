@@ -1,5 +1,26 @@
 from django.apps import AppConfig
+from django.db.models import CharField, TextField
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        import api.checks  # noqa: F401
+        from api.signals import (
+            CACHE_GROUPS, COUNTERS, USER_STATE, decrement_counter,
+            increment_counter, invalidate_response_cache,
+            invalidate_user_state,
+        )
+        for signal in (post_save, post_delete):
+            for model in CACHE_GROUPS:
+                signal.connect(invalidate_response_cache, sender=model)
+            for model in USER_STATE:
+                signal.connect(invalidate_user_state, sender=model)
+        for model in COUNTERS:
+            post_save.connect(increment_counter, sender=model)
+            post_delete.connect(decrement_counter, sender=model)
+        CharField.register_lookup(Lower)
+        TextField.register_lookup(Lower)
@@ -0,0 +1,248 @@
+import json
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from rest_framework import serializers
+
+from api.cache import bump_version, get_tag_map
+from api.fields import RecipeImageField
+from api.tasks import fan_out_recipes
+from recipes.management.bulk_load import batched
+from recipes.models import (
+    Ingredient, Recipe, RecipeIngredient, RecipeTag,
+)
+from recipes.tasks import build_renditions
+from users.models import User
+
+MAX_ERRORS = 100
+
+
+class BulkIngredientSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    measurement_unit = serializers.CharField()
+    amount = serializers.IntegerField(min_value=0)
+
+
+class BulkRecipeSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    text = serializers.CharField()
+    cooking_time = serializers.IntegerField(min_value=0)
+    image = serializers.CharField()
+    author = serializers.CharField(required=False)
+    tags = serializers.ListField(child=serializers.SlugField())
+    ingredients = BulkIngredientSerializer(many=True, allow_empty=False)
+
+    def validate_image(self, value):
+        if value.startswith('data:'):
+            return RecipeImageField().to_internal_value(value)
+        return value
+
+    def validate_author(self, value):
+        authors = self.context['authors']
+        if value not in authors:
+            raise serializers.ValidationError(
+                f'Пользователь {value} не найден'
+            )
+        return authors[value]
+
+    def validate_tags(self, value):
+        tags = self.context['tags']
+        unknown = [slug for slug in value if slug not in tags]
+        if unknown:
+            raise serializers.ValidationError(
+                f'Неизвестные теги: {", ".join(unknown)}'
+            )
+        return list(dict.fromkeys(tags[slug] for slug in value))
+
+    def validate_ingredients(self, value):
+        ingredients = self.context['ingredients']
+        amounts = {}
+        for item in value:
+            key = (item['name'], item['measurement_unit'])
+            if key not in ingredients:
+                raise serializers.ValidationError(
+                    f'Неизвестный ингредиент {item["name"]}, '
+                    f'{item["measurement_unit"]}'
+                )
+            if ingredients[key] in amounts:
+                raise serializers.ValidationError(
+                    f'Задайте ингредиент {item["name"]} одной строкой с'
+                    ' общим количеством'
+                )
+            amounts[ingredients[key]] = item['amount']
+        return amounts
+
+    def validate(self, data):
+        image = data['image']
+        author_id = data.get('author', self.context['author_id'])
+        if (
+            isinstance(image, str)
+            and (author_id, image) not in self.context['images']
+        ):
+            raise serializers.ValidationError({
+                'image': f'Файл {image} не найден среди изображений автора'
+            })
+        return data
+
+
+def get_ingredient_map():
+    return {
+        (name, measurement_unit): pk
+        for pk, name, measurement_unit in Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'
+        )
+    }
+
+
+def parse_batch(batch, context):
+    records = []
+    errors = []
+    for number, line in batch:
+        try:
+            records.append((number, json.loads(line)))
+        except ValueError as error:
+            errors.append({'line': number, 'errors': str(error)})
+    if context['authors'] is not None:
+        context['authors'] = dict(User.objects.filter(username__in={
+            record['author'] for _, record in records
+            if isinstance(record, dict)
+            and isinstance(record.get('author'), str)
+        }).values_list('username', 'id'))
+    context['images'] = set(Recipe.objects.filter(image__in={
+        record['image'] for _, record in records
+        if isinstance(record, dict) and isinstance(record.get('image'), str)
+        and not record['image'].startswith('data:')
+    }).values_list('author_id', 'image'))
+    valid = []
+    for number, record in records:
+        if context['authors'] is None and isinstance(record, dict):
+            record.pop('author', None)
+        serializer = BulkRecipeSerializer(data=record, context=context)
+        if serializer.is_valid():
+            valid.append(serializer.validated_data)
+        else:
+            errors.append({'line': number, 'errors': serializer.errors})
+    return valid, errors
+
+
+def insert_batch(records, author_id):
+    recipes = [
+        Recipe(
+            author_id=record.get('author', author_id),
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+            image=record['image'],
+        )
+        for record in records
+    ]
+    with transaction.atomic():
+        if connection.features.can_return_ids_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+            for author, number in Counter(
+                recipe.author_id for recipe in recipes
+            ).items():
+                User.objects.filter(id=author).update(
+                    recipes_count=F('recipes_count') + number
+                )
+        else:
+            for recipe in recipes:
+                recipe.save()
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for recipe, record in zip(recipes, records)
+            for ingredient_id, amount in record['ingredients'].items()
+        )
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag_id=tag_id)
+            for recipe, record in zip(recipes, records)
+            for tag_id in record['tags']
+        )
+        transaction.on_commit(partial(bump_version, 'recipes'))
+    return recipes
+
+
+def batched_lines(numbered, batch_size, batch_bytes):
+    batch = []
+    size = 0
+    for number, line in numbered:
+        batch.append((number, line))
+        size += len(line)
+        if len(batch) >= batch_size or size >= batch_bytes:
+            yield batch
+            batch = []
+            size = 0
+    if batch:
+        yield batch
+
+
+def import_recipes(lines, author, batch_size=1000, record_authors=False,
+                   renditions=True):
+    context = {
+        'ingredients': get_ingredient_map(),
+        'tags': get_tag_map(),
+        'authors': {} if record_authors else None,
+        'author_id': author.id,
+    }
+    numbered = (
+        (number, line) for number, line in enumerate(lines, 1)
+        if line.strip()
+    )
+    created = 0
+    failed = 0
+    errors = []
+    for batch in batched_lines(
+        numbered, batch_size, settings.RECIPE_BULK_BATCH_BYTES
+    ):
+        valid, batch_errors = parse_batch(batch, context)
+        failed += len(batch_errors)
+        errors.extend(batch_errors[:MAX_ERRORS - len(errors)])
+        if not valid:
+            continue
+        recipes = insert_batch(valid, author.id)
+        created += len(recipes)
+        fan_out_recipes.delay([recipe.id for recipe in recipes])
+        if renditions:
+            for recipe in recipes:
+                build_renditions.delay(recipe.id)
+    return {'created': created, 'failed': failed, 'errors': errors}
+
+
+def export_recipes(queryset, batch_size=1000):
+    recipes = queryset.select_related('author').defer(
+        'search_vector', 'ingredient_ids'
+    ).order_by('id').iterator(chunk_size=batch_size)
+    for batch in batched(recipes, batch_size):
+        ids = [recipe.id for recipe in batch]
+        ingredients = defaultdict(list)
+        for row in RecipeIngredient.objects.filter(
+            recipe_id__in=ids
+        ).order_by('id').values(
+            'recipe_id', 'ingredient__name', 'ingredient__measurement_unit',
+            'amount'
+        ):
+            ingredients[row['recipe_id']].append({
+                'name': row['ingredient__name'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+                'amount': row['amount'],
+            })
+        tags = defaultdict(list)
+        for recipe_id, slug in RecipeTag.objects.filter(
+            recipe_id__in=ids
+        ).order_by('id').values_list('recipe_id', 'tag__slug'):
+            tags[recipe_id].append(slug)
+        for recipe in batch:
+            yield json.dumps({
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'image': recipe.image.name,
+                'author': recipe.author.username,
+                'tags': tags[recipe.id],
+                'ingredients': ingredients[recipe.id],
+            }, ensure_ascii=False) + '\n'
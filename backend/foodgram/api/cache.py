@@ -0,0 +1,169 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from recipes.models import Tag
+
+KEY_PREFIX = 'response_cache'
+STATS = ('hits', 'misses')
+CONDITIONAL_HEADERS = ('ETag', 'Last-Modified')
+
+
+def get_version(group):
+    return cache.get_or_set(
+        f'{KEY_PREFIX}:version:{group}', time.time_ns(), None
+    )
+
+
+def get_user_group(user_id):
+    return f'user:{user_id}'
+
+
+def bump_version(group):
+    key = f'{KEY_PREFIX}:version:{group}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_tag_map():
+    return cache.get_or_set(
+        f'{KEY_PREFIX}:tag_map:{get_version("tags")}',
+        lambda: dict(Tag.objects.values_list('slug', 'id')),
+        None
+    )
+
+
+def count(stat):
+    key = f'{KEY_PREFIX}:{stat}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_stats():
+    values = cache.get_many([f'{KEY_PREFIX}:{stat}' for stat in STATS])
+    return {
+        stat: values.get(f'{KEY_PREFIX}:{stat}', 0) for stat in STATS
+    }
+
+
+class AnonymousCacheMixin:
+    cache_groups = ()
+
+    def get_cache_key(self, request):
+        versions = ':'.join(
+            str(get_version(group)) for group in self.cache_groups
+        )
+        source = '|'.join((
+            versions,
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        ))
+        return f'{KEY_PREFIX}:{hashlib.md5(source.encode()).hexdigest()}'
+
+    def get_cached_response(self, request, key):
+        cached = cache.get(key)
+        if cached is None:
+            return None
+        count('hits')
+        content, content_type, headers = cached
+        response = HttpResponse(content, content_type=content_type)
+        for header, value in headers.items():
+            response[header] = value
+        response['X-Cache'] = 'HIT'
+        return get_conditional_response(
+            request,
+            etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(
+                headers.get('Last-Modified', '')
+            ),
+            response=response
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if (
+            not settings.RESPONSE_CACHE_ENABLED
+            or request.method != 'GET'
+            or 'HTTP_AUTHORIZATION' in request.META
+        ):
+            return super().dispatch(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        response = self.get_cached_response(request, key)
+        if response is not None:
+            return response
+        count('misses')
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            response.render()
+            headers = {
+                header: response[header]
+                for header in CONDITIONAL_HEADERS
+                if response.has_header(header)
+            }
+            cache.set(
+                key,
+                (response.content, response['Content-Type'], headers),
+                settings.RESPONSE_CACHE_TIMEOUT
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin:
+    last_modified_field = 'updated'
+    etag_groups = ('recipes', 'tags', 'ingredients', 'users')
+
+    def get_etag(self, request, *parts):
+        groups = list(self.etag_groups)
+        if request.user.is_authenticated:
+            groups.append(get_user_group(request.user.pk))
+        source = '|'.join(str(part) for part in (
+            request.get_full_path(),
+            *(get_version(group) for group in groups),
+            *parts,
+        ))
+        return f'"{hashlib.md5(source.encode()).hexdigest()}"'
+
+    def conditional(self, request, view, etag, last_modified=None,
+                    **kwargs):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp if request.user.is_anonymous else None
+        ) or view(request, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return super().list(request, *args, **kwargs)
+        return self.conditional(
+            request, super().list, self.get_etag(request), **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        last_modified = None
+        if settings.RESPONSE_CACHE_ENABLED and str(kwargs['pk']).isdigit():
+            last_modified = self.queryset.model.objects.filter(
+                pk=kwargs['pk']
+            ).values_list(self.last_modified_field, flat=True).first()
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional(
+            request, super().retrieve,
+            self.get_etag(request, last_modified), last_modified, **kwargs
+        )
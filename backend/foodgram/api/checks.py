@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core import checks
+
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@checks.register()
+def check_response_cache(app_configs, **kwargs):
+    if (
+        settings.RESPONSE_CACHE_ENABLED
+        and settings.CACHES['default']['BACKEND'] in LOCAL_CACHES
+    ):
+        return [checks.Warning(
+            'Кэш ответов и версии групп хранятся в кэше отдельного процесса: '
+            'другие воркеры будут отдавать устаревшие данные.',
+            hint='Задайте REDIS_URL или RESPONSE_CACHE_ENABLED=False.',
+            id='api.W001',
+        )]
+    return []
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db.models import Q
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+
+
+def fan_out_recipes(recipe_ids):
+    recipes = Recipe.objects.filter(
+        id__in=recipe_ids,
+        author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('id', 'author_id')
+    for recipe_id, author_id in recipes:
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(
+                    user_id=follower_id, author_id=author_id,
+                    recipe_id=recipe_id
+                )
+                for follower_id in Follow.objects.filter(
+                    following_id=author_id
+                ).values_list('follower_id', flat=True)
+            ],
+            ignore_conflicts=True
+        )
+
+
+def backfill_feed(follower_id, author_id):
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=follower_id, author_id=author_id, recipe_id=recipe_id
+            )
+            for recipe_id in Recipe.objects.filter(
+                author_id=author_id
+            ).order_by('-id').values_list(
+                'id', flat=True
+            )[:settings.FEED_BACKFILL_SIZE]
+        ],
+        ignore_conflicts=True
+    )
+
+
+def trim_feed(follower_id, author_id):
+    FeedEntry.objects.filter(user_id=follower_id, author_id=author_id).delete()
+
+
+def get_feed_filter(user):
+    large_authors = list(Follow.objects.filter(
+        follower=user,
+        following__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('following_id', flat=True))
+    if not large_authors:
+        return Q(feedentry__user=user)
+    return Q(
+        id__in=FeedEntry.objects.filter(user=user).values('recipe_id')
+    ) | Q(author__in=large_authors)
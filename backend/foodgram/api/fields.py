@@ -0,0 +1,25 @@
+from django.conf import settings
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+
+class RecipeImageField(Base64ImageField):
+
+    def to_internal_value(self, base64_data):
+        if (
+            isinstance(base64_data, str)
+            and len(base64_data) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE
+        ):
+            raise serializers.ValidationError(
+                'Размер изображения не должен превышать '
+                f'{settings.RECIPE_IMAGE_MAX_SIZE // (1024 * 1024)} МБ'
+            )
+        image = super().to_internal_value(base64_data)
+        if image is not None and (
+            max(image.image.size) > settings.RECIPE_IMAGE_MAX_DIMENSION
+        ):
+            raise serializers.ValidationError(
+                'Стороны изображения не должны превышать '
+                f'{settings.RECIPE_IMAGE_MAX_DIMENSION} пикселей'
+            )
+        return image
@@ -1,46 +1,118 @@
 import django_filters
+from django import forms
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import (
+    Case, Count, Exists, F, FloatField, OuterRef, Q, Value, When,
+)
 from django_filters.widgets import BooleanWidget
 
-from recipes.models import Ingredient, Recipe
+from api.cache import get_tag_map
+from recipes.indexes import SEARCH_CONFIG
+from recipes.models import Recipe, RecipeIngredient, RecipeTag
 
+TAGS_MODES = (
+    ('any', 'Любой из тегов'),
+    ('all', 'Все теги'),
+)
 
-class IngredientFilter(django_filters.FilterSet):
 
-    name = django_filters.CharFilter(
-        lookup_expr='istartswith'
-    )
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_map()]
+
+
+def is_postgresql(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
 
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
+
+class IntegerInFilter(django_filters.BaseInFilter,
+                      django_filters.NumberFilter):
+    field_class = forms.IntegerField
 
 
 class ResipeFilter(django_filters.FilterSet):
 
     is_favorited = django_filters.BooleanFilter(
         field_name='is_favorited',
-        method='favorite_filter',
+        method='user_flag_filter',
         widget=BooleanWidget
     )
 
     is_in_shopping_cart = django_filters.BooleanFilter(
         field_name='is_in_shopping_cart',
-        method='shopping_cart_filter',
+        method='user_flag_filter',
         widget=BooleanWidget
     )
 
-    tags = django_filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = django_filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='tags_filter'
+    )
 
-    def favorite_filter(self, queryset, name, value):
-        if value and not self.request.user.is_anonymous:
-            return queryset.filter(favorite__user=self.request.user)
-        return queryset
+    tags_mode = django_filters.ChoiceFilter(
+        choices=TAGS_MODES,
+        method='tags_mode_filter'
+    )
+
+    search = django_filters.CharFilter(method='search_filter')
+
+    ingredients = IntegerInFilter(method='ingredients_filter')
+
+    def search_filter(self, queryset, name, value):
+        if is_postgresql(queryset):
+            query = SearchQuery(value, config=SEARCH_CONFIG)
+            return queryset.filter(search_vector=query).annotate(
+                search_rank=SearchRank(F('search_vector'), query)
+            ).order_by('-search_rank', '-id')
+        value = value.lower()
+        for word in value.split():
+            queryset = queryset.filter(
+                Q(name__lower__contains=word) | Q(text__lower__contains=word)
+            )
+        return queryset.annotate(search_rank=Case(
+            When(name__lower__contains=value, then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField()
+        )).order_by('-search_rank', '-id')
 
-    def shopping_cart_filter(self, queryset, name, value):
-        if value and not self.request.user.is_anonymous:
-            return Recipe.objects.filter(shoppinglist__user=self.request.user)
+    def ingredients_filter(self, queryset, name, value):
+        ingredient_ids = sorted(set(value))
+        if not ingredient_ids:
+            return queryset
+        if is_postgresql(queryset):
+            return queryset.filter(ingredient_ids__contains=ingredient_ids)
+        return queryset.annotate(has_ingredients=Exists(
+            RecipeIngredient.objects.filter(
+                recipe=OuterRef('pk'),
+                ingredient_id__in=ingredient_ids
+            ).values('recipe').annotate(
+                total=Count('id')
+            ).filter(total=len(ingredient_ids))
+        )).filter(has_ingredients=True)
+
+    def tags_filter(self, queryset, name, value):
+        tag_map = get_tag_map()
+        tag_ids = {tag_map[slug] for slug in value}
+        tagged = RecipeTag.objects.filter(
+            recipe=OuterRef('pk'),
+            tag_id__in=tag_ids
+        )
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            tagged = tagged.values('recipe').annotate(
+                total=Count('id')
+            ).filter(total=len(tag_ids))
+        return queryset.annotate(
+            has_tags=Exists(tagged)
+        ).filter(has_tags=True)
+
+    def tags_mode_filter(self, queryset, name, value):
         return queryset
 
+    def user_flag_filter(self, queryset, name, value):
+        if name not in queryset.query.annotations:
+            queryset = queryset.with_user_flags(self.request.user)
+        return queryset.filter(**{name: value})
+
     class Meta:
         model = Recipe
         fields = ('tags', 'author',)
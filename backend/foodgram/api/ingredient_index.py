@@ -0,0 +1,73 @@
+import bisect
+import threading
+import time
+from itertools import islice
+
+from django.conf import settings
+
+from api.cache import get_version
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = None
+        self.ingredients = None
+        self.built_at = 0
+        self.version = None
+
+    def invalidate(self):
+        with self.lock:
+            self.keys = None
+            self.ingredients = None
+
+    def build(self):
+        ingredients = {
+            ingredient['id']: ingredient
+            for ingredient in Ingredient.objects.values(
+                'id', 'name', 'measurement_unit'
+            )
+        }
+        keys = sorted(
+            (ingredient['name'].casefold(), pk)
+            for pk, ingredient in ingredients.items()
+        )
+        return keys, ingredients
+
+    def get(self):
+        version = get_version('ingredients')
+        with self.lock:
+            expired = (
+                time.monotonic() - self.built_at
+                > settings.INGREDIENT_INDEX_TTL
+            )
+            if self.keys is None or expired or version != self.version:
+                self.keys, self.ingredients = self.build()
+                self.built_at = time.monotonic()
+                self.version = version
+            return self.keys, self.ingredients
+
+    def search(self, name=''):
+        keys, ingredients = self.get()
+        name = name.casefold()
+        start = bisect.bisect_left(keys, (name,))
+        found = []
+        for key, pk in keys[start:]:
+            if not key.startswith(name):
+                break
+            found.append(pk)
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+        if name and len(found) < limit:
+            found.extend(islice(
+                (
+                    pk for key, pk in keys
+                    if name in key and not key.startswith(name)
+                ),
+                limit - len(found)
+            ))
+        return [ingredients[pk] for pk in found]
+
+
+ingredient_index = IngredientIndex()
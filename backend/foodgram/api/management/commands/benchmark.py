@@ -0,0 +1,216 @@
+import base64
+import io
+import json
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_databases,
+    setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.management.commands.generate_fake_data import WORDS
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from tasks.backends import get_backend
+from users.models import User
+
+SCALES = {
+    'small': {'users': 50, 'recipes': 500},
+    'medium': {'users': 200, 'recipes': 5000},
+    'large': {'users': 1000, 'recipes': 50000},
+}
+WARMUP = 2
+PREFIXES = ('а', 'мо', 'сах', 'кур', 'с', 'пер')
+METRICS = ('rps', 'p50_ms', 'p99_ms', 'queries')
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, len(values) * percent // 100)]
+
+
+def get_image():
+    file = io.BytesIO()
+    Image.new('RGB', (32, 32), (200, 120, 40)).save(file, 'PNG')
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(file.getvalue()).decode()
+    )
+
+
+class Command(BaseCommand):
+    help = ('Замеряет пропускную способность, задержки и число SQL-запросов '
+            'основных эндпоинтов API на тестовой базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', nargs='+', choices=SCALES, default=['small', 'medium']
+        )
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output')
+        parser.add_argument('--baseline')
+
+    def get_cases(self, user):
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        own_recipes = list(Recipe.objects.filter(author=user).values_list(
+            'id', flat=True
+        ))
+        tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        image = get_image()
+        popular_ingredients = list(RecipeIngredient.objects.values_list(
+            'ingredient_id', flat=True
+        )[:2])
+
+        def payload():
+            return {
+                'name': 'Тестовый рецепт',
+                'text': 'Описание',
+                'cooking_time': 30,
+                'image': image,
+                'tags': random.sample(tag_ids, 2),
+                'ingredients': [
+                    {'id': ingredient_id, 'amount': random.randint(1, 500)}
+                    for ingredient_id in random.sample(ingredient_ids, 8)
+                ],
+            }
+
+        return {
+            'recipe-list': lambda: (
+                'get', f'/api/recipes/?limit=6&page={random.randint(1, 20)}'
+            ),
+            'recipe-detail': lambda: (
+                'get', f'/api/recipes/{random.choice(recipe_ids)}/'
+            ),
+            'recipe-list-filtered': lambda: (
+                'get',
+                f'/api/recipes/?limit=6&tags={random.choice(tag_slugs)}'
+                '&is_favorited=1'
+            ),
+            'subscriptions': lambda: (
+                'get', '/api/users/subscriptions/?limit=6&recipes_limit=3'
+            ),
+            'recipe-search': lambda: (
+                'get', f'/api/recipes/?limit=6&search={random.choice(WORDS)}'
+            ),
+            'recipe-ingredients': lambda: (
+                'get',
+                '/api/recipes/?limit=6&ingredients='
+                + ','.join(str(pk) for pk in popular_ingredients)
+            ),
+            'feed': lambda: ('get', '/api/recipes/feed/?limit=6'),
+            'ingredient-autocomplete': lambda: (
+                'get', f'/api/ingredients/?name={random.choice(PREFIXES)}'
+            ),
+            'download-shopping-cart': lambda: (
+                'get', '/api/recipes/download_shopping_cart/'
+            ),
+            'recipe-create': lambda: ('post', '/api/recipes/', payload()),
+            'recipe-update': lambda: (
+                'patch', f'/api/recipes/{random.choice(own_recipes)}/',
+                payload()
+            ),
+            'recipe-rename': lambda: (
+                'patch', f'/api/recipes/{random.choice(own_recipes)}/',
+                {'name': f'Рецепт {random.randint(1, 1000)}'}
+            ),
+        }
+
+    def measure(self, client, request, iterations):
+        latencies = []
+        queries = []
+        for number in range(WARMUP + iterations):
+            method, url, *data = request()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, *data, format='json')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{method.upper()} {url}: {response.status_code}'
+                )
+            if number >= WARMUP:
+                latencies.append(elapsed)
+                queries.append(len(context.captured_queries))
+        return {
+            'rps': round(len(latencies) / sum(latencies), 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'queries': max(queries),
+        }
+
+    def run_scale(self, scale, options):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            call_command(
+                'generate_fake_data', seed=options['seed'],
+                stdout=io.StringIO(), **SCALES[scale]
+            )
+            user = User.objects.annotate(
+                cart=Count('shoppinglist', distinct=True),
+                follows=Count('follower', distinct=True),
+            ).order_by('-cart', '-follows').first()
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=(
+                f'Token {Token.objects.create(user=user).key}'
+            ))
+            results = {}
+            for name, request in self.get_cases(user).items():
+                results[f'{scale} {name}'] = self.measure(
+                    client, request, options['iterations']
+                )
+                self.stdout.write(
+                    f'{scale} {name}: {results[f"{scale} {name}"]}'
+                )
+            return results
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def compare(self, baseline, results):
+        for name, values in results.items():
+            before = baseline.get(name)
+            if not before:
+                continue
+            changes = ', '.join(
+                f'{metric} {before[metric]} -> {values[metric]}'
+                for metric in METRICS
+                if before.get(metric) != values[metric]
+            )
+            self.stdout.write(f'{name}: {changes or "без изменений"}')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        media_root = tempfile.mkdtemp()
+        setup_test_environment()
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                TASKS_BACKEND='tasks.backends.ImmediateBackend',
+            ):
+                get_backend.cache_clear()
+                results = {}
+                for scale in options['scales']:
+                    results.update(self.run_scale(scale, options))
+        finally:
+            get_backend.cache_clear()
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2, ensure_ascii=False)
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                self.compare(json.load(file), results)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.tasks import delete_expired_exports, get_exports_storage
+from tasks.runner import delete_expired_tasks
+
+
+class Command(BaseCommand):
+    help = 'Удаляет завершённые задачи и файлы выгрузок с истёкшим сроком'
+
+    def handle(self, *args, **options):
+        delete_expired_exports(get_exports_storage())
+        deleted = delete_expired_tasks()
+        self.stdout.write(self.style.SUCCESS(f'Удалено задач: {deleted}'))
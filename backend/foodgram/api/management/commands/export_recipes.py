@@ -0,0 +1,29 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api.bulk import export_recipes
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты в NDJSON файл'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Путь к файлу или - для stdout'
+        )
+        parser.add_argument('--author')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options['author']:
+            recipes = recipes.filter(author__username=options['author'])
+        lines = export_recipes(recipes, options['batch_size'])
+        if options['path'] == '-':
+            sys.stdout.writelines(lines)
+            return
+        with open(options['path'], 'w', encoding='utf-8') as file:
+            file.writelines(lines)
@@ -0,0 +1,178 @@
+import os
+import random
+import time
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from PIL import Image
+
+from api.cache import bump_version
+from recipes.images import build_renditions
+from recipes.management.bulk_load import batched, iter_json
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, RecipeTag, ShoppingList,
+    Tag,
+)
+from users.models import Follow, User
+
+FAKE_PASSWORD = 'fake-password'
+FAKE_IMAGE = 'images/fake.jpg'
+FAKE_IMAGE_SIZE = (1024, 768)
+WORDS = (
+    'домашний', 'быстрый', 'пряный', 'летний', 'сытный', 'лёгкий',
+    'суп', 'салат', 'пирог', 'рагу', 'омлет', 'запеканка',
+)
+
+
+def sample(population, low, high):
+    return random.sample(
+        population, min(len(population), random.randint(low, high))
+    )
+
+
+class Command(BaseCommand):
+    help = 'Генерирует пользователей, рецепты, избранное, покупки и подписки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients', type=int, nargs=2,
+                            default=(3, 12))
+        parser.add_argument('--tags', type=int, nargs=2, default=(1, 3))
+        parser.add_argument('--favorites', type=int, nargs=2,
+                            default=(0, 40))
+        parser.add_argument('--cart', type=int, nargs=2, default=(0, 15))
+        parser.add_argument('--follows', type=int, nargs=2, default=(0, 20))
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--ingredients-path',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.json')
+        )
+
+    def bulk_create(self, model, objects):
+        started = time.monotonic()
+        total = 0
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+            total += len(batch)
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: {total} '
+            f'за {time.monotonic() - started:.1f} с'
+        )
+
+    def create_ids(self, model, objects):
+        last_id = model.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first() or 0
+        self.bulk_create(model, objects)
+        return list(
+            model.objects.filter(id__gt=last_id).values_list('id', flat=True)
+        )
+
+    def ensure_catalogue(self, path):
+        if not Ingredient.objects.exists():
+            with open(path, encoding='utf-8') as file:
+                self.bulk_create(Ingredient, (
+                    Ingredient(**item) for item in iter_json(file)
+                ))
+        if not Tag.objects.exists():
+            call_command('load_tags', stdout=self.stdout)
+        return (
+            list(Ingredient.objects.values_list('id', flat=True)),
+            list(Tag.objects.values_list('id', flat=True)),
+        )
+
+    def create_users(self, number):
+        offset = User.objects.count()
+        password = make_password(FAKE_PASSWORD)
+        return self.create_ids(User, (
+            User(
+                username=f'fake{offset + index}',
+                email=f'fake{offset + index}@example.com',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password,
+            )
+            for index in range(number)
+        ))
+
+    def create_image(self):
+        if default_storage.exists(FAKE_IMAGE):
+            return
+        content = BytesIO()
+        Image.effect_noise(FAKE_IMAGE_SIZE, 64).convert('RGB').save(
+            content, 'JPEG'
+        )
+        default_storage.save(FAKE_IMAGE, ContentFile(content.getvalue()))
+
+    def create_recipes(self, number, user_ids):
+        weights = [1 / rank for rank in range(1, len(user_ids) + 1)]
+        return self.create_ids(Recipe, (
+            Recipe(
+                author_id=author_id,
+                name=' '.join(random.sample(WORDS, 3)).capitalize(),
+                text=' '.join(random.choices(WORDS, k=40)),
+                image=FAKE_IMAGE,
+                cooking_time=random.randint(5, 180),
+            )
+            for author_id in random.choices(user_ids, weights, k=number)
+        ))
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            ingredient_ids, tag_ids = self.ensure_catalogue(
+                options['ingredients_path']
+            )
+            user_ids = self.create_users(options['users'])
+            self.create_image()
+            recipe_ids = self.create_recipes(options['recipes'], user_ids)
+            if recipe_ids:
+                build_renditions(recipe_ids[0])
+                Recipe.objects.filter(image=FAKE_IMAGE).update(
+                    renditions_ready=True
+                )
+            self.bulk_create(RecipeIngredient, (
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=random.randint(1, 500),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in sample(
+                    ingredient_ids, *options['ingredients']
+                )
+            ))
+            self.bulk_create(RecipeTag, (
+                RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in sample(tag_ids, *options['tags'])
+            ))
+            for model, option in ((Favorite, 'favorites'),
+                                  (ShoppingList, 'cart')):
+                self.bulk_create(model, (
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id in user_ids
+                    for recipe_id in sample(recipe_ids, *options[option])
+                ))
+            self.bulk_create(Follow, (
+                Follow(follower_id=user_id, following_id=following_id)
+                for user_id in user_ids
+                for following_id in sample(user_ids, *options['follows'])
+                if following_id != user_id
+            ))
+            call_command('recount', stdout=self.stdout)
+            call_command('rebuild_shopping_lists', stdout=self.stdout)
+            call_command('rebuild_feeds', stdout=self.stdout)
+            for group in ('ingredients', 'tags', 'recipes'):
+                transaction.on_commit(partial(bump_version, group))
+        self.stdout.write(self.style.SUCCESS('Тестовые данные созданы'))
@@ -0,0 +1,47 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk import import_recipes
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Импортирует рецепты из NDJSON файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу или - для stdin')
+        parser.add_argument('--author', required=True)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--renditions', action='store_true')
+
+    def handle(self, *args, **options):
+        author = User.objects.filter(username=options['author']).first()
+        if author is None:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден'
+            )
+        started = time.monotonic()
+        if options['path'] == '-':
+            result = self.run(sys.stdin, author, options)
+        else:
+            with open(options['path'], encoding='utf-8') as file:
+                result = self.run(file, author, options)
+        elapsed = time.monotonic() - started
+        for error in result['errors']:
+            self.stderr.write(f'строка {error["line"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано {result["created"]}, пропущено {result["failed"]} '
+            f'за {elapsed:.1f} с '
+            f'({result["created"] / max(elapsed, 0.001):.0f} рецептов/с)'
+        ))
+
+    def run(self, file, author, options):
+        return import_recipes(
+            file,
+            author,
+            batch_size=options['batch_size'],
+            record_authors=True,
+            renditions=options['renditions'],
+        )
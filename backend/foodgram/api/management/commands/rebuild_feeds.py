@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.feed import backfill_feed
+from recipes.models import FeedEntry
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок последними рецептами авторов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true')
+
+    def handle(self, *args, **options):
+        follows = list(Follow.objects.order_by('id').values_list(
+            'follower_id', 'following_id'
+        ))
+        with transaction.atomic():
+            if options['clear']:
+                FeedEntry.objects.all().delete()
+            for follower_id, following_id in follows:
+                backfill_feed(follower_id, following_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты заполнены по {len(follows)} подпискам'
+        ))
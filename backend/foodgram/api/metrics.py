@@ -0,0 +1,279 @@
+import ipaddress
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'foodgram'
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Время обработки запроса', TIME_BUCKETS
+    ),
+    'db_duration_seconds': (
+        'Время выполнения SQL-запросов за запрос', TIME_BUCKETS
+    ),
+    'serialization_duration_seconds': (
+        'Время представления вне БД: сериализация, пагинация, рендеринг',
+        TIME_BUCKETS
+    ),
+    'db_queries': ('Число SQL-запросов за запрос', QUERY_BUCKETS),
+}
+WORKERS_KEY = 'metrics:workers'
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+SQL_LISTS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+SLOW_REQUEST_SHAPES = 5
+
+
+def get_shape(sql):
+    return SQL_LISTS.sub('(...)', SQL_LITERALS.sub('?', sql))
+
+
+class QueryRecorder:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.statements = Counter()
+        self.view_started = None
+        self.view_db_duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def mark_view(self):
+        self.view_started = time.perf_counter()
+        self.view_db_duration = self.duration
+
+    def get_serialization_duration(self):
+        if self.view_started is None:
+            return 0
+        return (
+            time.perf_counter() - self.view_started
+            - (self.duration - self.view_db_duration)
+        )
+
+    def get_top_shapes(self):
+        shapes = Counter()
+        for sql, number in self.statements.items():
+            shapes[get_shape(sql)] += number
+        return shapes.most_common(SLOW_REQUEST_SHAPES)
+
+
+class Metrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.requests = Counter()
+        self.flushed_at = time.monotonic()
+        self.worker = f'{socket.gethostname()}:{os.getpid()}'
+
+    def observe(self, view, method, status, **values):
+        with self.lock:
+            self.requests[(view, method, str(status))] += 1
+            for name, value in values.items():
+                buckets = HISTOGRAMS[name][1]
+                series = self.histograms.setdefault(
+                    (name, view, method), [0] * (len(buckets) + 2)
+                )
+                position = next(
+                    (
+                        number for number, bound in enumerate(buckets)
+                        if value <= bound
+                    ),
+                    len(buckets)
+                )
+                series[position] += 1
+                series[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'histograms': {
+                    key: list(series)
+                    for key, series in self.histograms.items()
+                },
+                'requests': dict(self.requests),
+            }
+
+    def flush(self, force=False):
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if not force and time.monotonic() - self.flushed_at < interval:
+            return
+        self.flushed_at = time.monotonic()
+        cache.set(
+            f'metrics:worker:{self.worker}', self.snapshot(), interval * 6
+        )
+        workers = cache.get(WORKERS_KEY, [])
+        if self.worker not in workers:
+            cache.set(WORKERS_KEY, [*workers, self.worker], None)
+
+    def collect(self):
+        self.flush(force=True)
+        workers = cache.get(WORKERS_KEY, [])
+        snapshots = cache.get_many(
+            [f'metrics:worker:{worker}' for worker in workers]
+        )
+        alive = [
+            worker for worker in workers
+            if f'metrics:worker:{worker}' in snapshots
+        ]
+        if alive != workers:
+            cache.set(WORKERS_KEY, alive, None)
+        histograms = {}
+        requests = Counter()
+        for snapshot in snapshots.values():
+            for key, series in snapshot['histograms'].items():
+                total = histograms.setdefault(key, [0] * len(series))
+                for position, value in enumerate(series):
+                    total[position] += value
+            requests.update(snapshot['requests'])
+        return histograms, requests
+
+
+metrics = Metrics()
+
+
+def format_labels(**labels):
+    return ','.join(
+        f'{name}="{value}"' for name, value in labels.items()
+    )
+
+
+def render_histogram(name, help_text, buckets, histograms):
+    lines = [
+        f'# HELP {PREFIX}_{name} {help_text}',
+        f'# TYPE {PREFIX}_{name} histogram',
+    ]
+    for (series_name, view, method), series in sorted(histograms.items()):
+        if series_name != name:
+            continue
+        labels = format_labels(view=view, method=method)
+        cumulative = 0
+        for bound, value in zip((*buckets, '+Inf'), series):
+            cumulative += value
+            lines.append(
+                f'{PREFIX}_{name}_bucket{{{labels},le="{bound}"}} '
+                f'{cumulative}'
+            )
+        lines.append(f'{PREFIX}_{name}_sum{{{labels}}} {series[-1]}')
+        lines.append(f'{PREFIX}_{name}_count{{{labels}}} {cumulative}')
+    return lines
+
+
+def is_allowed(request):
+    if request.user.is_staff:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network)
+        for network in settings.METRICS_ALLOWED_IPS
+    )
+
+
+def metrics_view(request):
+    if not is_allowed(request):
+        raise PermissionDenied
+    histograms, requests = metrics.collect()
+    lines = [
+        f'# HELP {PREFIX}_requests_total Число обработанных запросов',
+        f'# TYPE {PREFIX}_requests_total counter',
+    ]
+    for (view, method, status), value in sorted(requests.items()):
+        labels = format_labels(view=view, method=method, status=status)
+        lines.append(f'{PREFIX}_requests_total{{{labels}}} {value}')
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.extend(render_histogram(name, help_text, buckets, histograms))
+    return HttpResponse(
+        '\n'.join(lines) + '\n',
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def record_queries(recorder):
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+    return stack
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        request.query_recorder = recorder
+        started = time.perf_counter()
+        with record_queries(recorder):
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, recorder,
+                started
+            )
+        else:
+            self.observe(request, response, recorder, started)
+        return response
+
+    def stream(self, content, request, response, recorder, started):
+        try:
+            with record_queries(recorder):
+                yield from content
+        finally:
+            self.observe(request, response, recorder, started)
+
+    def observe(self, request, response, recorder, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.observe(
+            view,
+            request.method,
+            response.status_code,
+            request_duration_seconds=duration,
+            db_duration_seconds=recorder.duration,
+            serialization_duration_seconds=(
+                recorder.get_serialization_duration()
+            ),
+            db_queries=recorder.count,
+        )
+        metrics.flush()
+        if duration >= settings.METRICS_SLOW_REQUEST_SECONDS:
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.3f с, %d SQL-запросов за '
+                '%.3f с, повторяющиеся запросы: %s',
+                request.method, request.get_full_path(), view, duration,
+                recorder.count, recorder.duration, recorder.get_top_shapes()
+            )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        recorder = getattr(request, 'query_recorder', None)
+        if recorder is not None:
+            recorder.mark_view()
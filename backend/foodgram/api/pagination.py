@@ -1,5 +1,76 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+def get_approximate_count(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= settings.PAGINATION_APPROXIMATE_THRESHOLD:
+            return row[0]
+    try:
+        query = str(queryset.query)
+    except EmptyResultSet:
+        return 0
+    key = f'pagination:count:{hashlib.md5(query.encode()).hexdigest()}'
+    return cache.get_or_set(
+        key, queryset.count, settings.PAGINATION_COUNT_TIMEOUT
+    )
+
+
+class KeysetPagination(CursorPagination):
+    ordering = '-id'
+    page_size = 6
+    page_size_query_param = 'limit'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = (
+            get_approximate_count(queryset)
+            if settings.PAGINATION_APPROXIMATE_COUNT
+            else queryset.count()
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
 
 
 class LimitPagePagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if 'search_rank' not in queryset.query.annotations and (
+            request.query_params.get('pagination') == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        ):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset:
+            return self.keyset.to_html()
+        return super().to_html()
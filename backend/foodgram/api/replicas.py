@@ -0,0 +1,69 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+read_database = ContextVar('read_database', default=None)
+
+
+def get_pin_key(user):
+    return f'replicas:pin:{user.pk}'
+
+
+def choose_replica(user):
+    if not settings.DATABASE_REPLICAS:
+        return None
+    if user.is_authenticated and cache.get(get_pin_key(user)):
+        return None
+    return random.choices(
+        list(settings.DATABASE_REPLICAS),
+        weights=list(settings.DATABASE_REPLICAS.values())
+    )[0]
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaReadMixin:
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            read_database.set(choose_replica(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        read_database.set(None)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaPinMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            cache.set(
+                get_pin_key(user), True, settings.DB_REPLICA_PIN_SECONDS
+            )
+        return response
@@ -1,16 +1,27 @@
+import json
 import re
+from functools import partial
 
 from django.contrib.auth.hashers import make_password
+from django.db import transaction
 from django.forms import ValidationError
+from django.urls import reverse
 from djoser.serializers import UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers, validators
 
+from api.fields import RecipeImageField
+from api.shopping_cart import (
+    get_changed_ingredients, lock_recipe, update_recipe_shopping_lists,
+)
+from api.tasks import fan_out_recipes
+from recipes.images import delete_image_files, get_renditions
 from recipes.models import (
     Favorite, Ingredient, Recipe,
     RecipeIngredient, RecipeTag,
     ShoppingList, Tag,
 )
+from recipes.tasks import build_renditions
+from tasks.models import Task
 from users.models import Follow, User
 
 
@@ -25,6 +36,9 @@ class ModifiedDjoserUserSerializer(UserSerializer):
 
     def get_is_subscribed(self, obj):
         user = self.context.get('request').user
+        subscriptions = self.context.get('subscriptions')
+        if user.is_authenticated and subscriptions is not None:
+            return obj.id in subscriptions
         return (
             user.is_authenticated
             and Follow.objects.filter(follower=user, following=obj).exists()
@@ -77,7 +91,98 @@ def add_ingredients_and_tags(recipe, ingredients, tags):
     RecipeTag.objects.bulk_create(tag_list)
 
 
-class ReadRecipeSerializer(serializers.ModelSerializer):
+def update_ingredients(recipe, ingredients):
+    lock_recipe(recipe.id)
+    existing = {
+        item.ingredient_id: item
+        for item in RecipeIngredient.objects.filter(recipe=recipe)
+    }
+    amounts = {data['ingredient'].id: data['amount'] for data in ingredients}
+    changed_ids = get_changed_ingredients({
+        ingredient_id: item.amount for ingredient_id, item in existing.items()
+    }, amounts)
+    removed = set(existing) - set(amounts)
+    if removed:
+        RecipeIngredient.objects.filter(
+            recipe=recipe, ingredient_id__in=removed
+        ).delete()
+    changed = []
+    for ingredient_id, amount in amounts.items():
+        item = existing.get(ingredient_id)
+        if item is not None and item.amount != amount:
+            item.amount = amount
+            changed.append(item)
+    if changed:
+        RecipeIngredient.objects.bulk_update(changed, ['amount'])
+    added = [
+        RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id,
+                         amount=amount)
+        for ingredient_id, amount in amounts.items()
+        if ingredient_id not in existing
+    ]
+    if added:
+        RecipeIngredient.objects.bulk_create(added)
+    if changed_ids:
+        update_recipe_shopping_lists(recipe.id, changed_ids)
+
+
+def update_tags(recipe, tags):
+    existing = set(
+        RecipeTag.objects.filter(recipe=recipe).values_list(
+            'tag_id', flat=True
+        )
+    )
+    tag_ids = {tag.id for tag in tags}
+    if existing - tag_ids:
+        RecipeTag.objects.filter(
+            recipe=recipe, tag_id__in=existing - tag_ids
+        ).delete()
+    if tag_ids - existing:
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag_id=tag_id)
+            for tag_id in tag_ids - existing
+        )
+
+
+class RenditionsMixin:
+
+    def get_renditions(self, obj):
+        if not obj.renditions_ready:
+            return None
+        request = self.context.get('request')
+        renditions = get_renditions(obj.image.name)
+        if request is None:
+            return renditions
+        return {
+            rendition: {
+                extension: request.build_absolute_uri(url)
+                for extension, url in urls.items()
+            }
+            for rendition, urls in renditions.items()
+        }
+
+
+class UserFlagsMixin:
+
+    def get_user_flag(self, obj, flag, list_model):
+        value = getattr(obj, flag, None)
+        if value is not None:
+            return value
+        user = self.context.get('request').user
+        return (
+            user.is_authenticated
+            and list_model.objects.filter(user=user, recipe=obj).exists()
+        )
+
+    def get_is_favorited(self, obj):
+        return self.get_user_flag(obj, 'is_favorited', Favorite)
+
+    def get_is_in_shopping_cart(self, obj):
+        return self.get_user_flag(obj, 'is_in_shopping_cart', ShoppingList)
+
+
+class ReadRecipeSerializer(RenditionsMixin, UserFlagsMixin,
+                           serializers.ModelSerializer):
 
     author = ModifiedDjoserUserSerializer(read_only=True)
     ingredients = RecipeIngredientsSerializer(
@@ -85,36 +190,25 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
         source='recipeingredient_set'
     )
     tags = TagSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ['id', 'author', 'tags', 'name', 'text', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart', 'image',
-                  'cooking_time']
+                  'renditions', 'cooking_time']
 
-    def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and Favorite.objects.filter(user=user, recipe=obj).exists()
-        )
-
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and ShoppingList.objects.filter(user=user, recipe=obj).exists()
-        )
 
+class ShortRecipeSerializer(RenditionsMixin, serializers.ModelSerializer):
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = ['id', 'name', 'image', 'renditions', 'cooking_time']
 
 
 class RegistrationSerializer(serializers.ModelSerializer):
@@ -164,7 +258,7 @@ class FollowUnfollowSerializer(serializers.ModelSerializer):
 
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
@@ -174,6 +268,9 @@ class FollowUnfollowSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_subscribed(self, obj):
+        is_subscribed = getattr(obj, 'is_subscribed', None)
+        if is_subscribed is not None:
+            return is_subscribed
         follower = self.context.get('request').user
         return (
             follower.is_authenticated
@@ -184,13 +281,12 @@ class FollowUnfollowSerializer(serializers.ModelSerializer):
         )
 
     def get_recipes(self, obj):
-        recipes = Recipe.objects.filter(author=obj)
+        recipes = getattr(obj, 'short_recipes', None)
+        if recipes is None:
+            recipes = Recipe.objects.filter(author=obj)
         serializer = ShortRecipeSerializer(recipes, many=True)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
-
 
 class IngredientSerializer(serializers.ModelSerializer):
 
@@ -199,7 +295,8 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class WriteRecipeSerializer(serializers.ModelSerializer):
+class WriteRecipeSerializer(RenditionsMixin, UserFlagsMixin,
+                            serializers.ModelSerializer):
 
     author = serializers.SerializerMethodField()
     ingredients = RecipeIngredientsSerializer(
@@ -210,48 +307,46 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
         queryset=Tag.objects.all(),
         many=True
     )
-    image = Base64ImageField()
+    image = RecipeImageField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ['id', 'author', 'tags', 'name', 'text', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart', 'image',
-                  'cooking_time']
+                  'renditions', 'cooking_time']
 
     def get_author(self, obj):
         serializer = ModifiedDjoserUserSerializer(read_only=True)
         return serializer.data
 
-    def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and Favorite.objects.filter(user=user, recipe=obj).exists()
-        )
-
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and ShoppingList.objects.filter(user=user, recipe=obj).exists()
-        )
-
     def create(self, validated_data):
         ingredients = validated_data.pop('recipeingredient_set')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
-        add_ingredients_and_tags(recipe, ingredients, tags)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            add_ingredients_and_tags(recipe, ingredients, tags)
+            build_renditions.delay(recipe.id)
+            fan_out_recipes.delay([recipe.id])
         return recipe
 
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('recipeingredient_set')
-        tags = validated_data.pop('tags')
-        super().update(instance, validated_data)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        RecipeTag.objects.filter(recipe=instance).delete()
-        add_ingredients_and_tags(instance, ingredients, tags)
+        ingredients = validated_data.pop('recipeingredient_set', None)
+        tags = validated_data.pop('tags', None)
+        with transaction.atomic():
+            if 'image' in validated_data:
+                validated_data['renditions_ready'] = False
+                build_renditions.delay(instance.id)
+                transaction.on_commit(
+                    partial(delete_image_files, instance.image.name)
+                )
+            super().update(instance, validated_data)
+            if ingredients is not None:
+                update_ingredients(instance, ingredients)
+            if tags is not None:
+                update_tags(instance, tags)
         return instance
 
     def validate_ingredients(self, value):
@@ -265,3 +360,24 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
                 )
             used_ingredients.append(item['ingredient'])
         return value
+
+
+class TaskSerializer(serializers.ModelSerializer):
+
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Task
+        fields = ['id', 'name', 'status', 'attempts', 'result', 'error',
+                  'created', 'updated']
+
+    def get_result(self, obj):
+        result = json.loads(obj.result) if obj.result else None
+        if not isinstance(result, dict) or 'file' not in result:
+            return result
+        url = reverse('task-download', args=[obj.id])
+        request = self.context.get('request')
+        return {
+            'url': request.build_absolute_uri(url) if request else url,
+            'content_type': result['content_type'],
+        }
@@ -0,0 +1,133 @@
+import csv
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.management.bulk_load import batched
+from recipes.models import (
+    Recipe, RecipeIngredient, ShoppingList, ShoppingListItem,
+)
+from recipes.shopping_lists import sync_shopping_list_items
+from users.models import User
+
+CHUNK_SIZE = 2000
+USERS_BATCH_SIZE = 500
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 18
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def get_shopping_cart(user):
+    return ShoppingListItem.objects.filter(user=user).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'total_amount'
+    ).order_by('ingredient__name').iterator(chunk_size=CHUNK_SIZE)
+
+
+def lock_recipe(recipe_id):
+    list(Recipe.objects.select_for_update().filter(
+        id=recipe_id
+    ).values_list('id', flat=True))
+
+
+def update_shopping_lists(user_ids, ingredient_ids):
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    with transaction.atomic(savepoint=False):
+        list(User.objects.select_for_update().filter(
+            id__in=user_ids
+        ).order_by('id').values_list('id', flat=True))
+        sync_shopping_list_items(user_ids, ingredient_ids)
+
+
+def change_cart_recipe(recipe_id, user_ids):
+    update_shopping_lists(
+        user_ids,
+        RecipeIngredient.objects.filter(
+            recipe_id=recipe_id
+        ).values('ingredient_id')
+    )
+
+
+def get_changed_ingredients(previous, current):
+    return sorted(
+        ingredient_id for ingredient_id in previous.keys() | current.keys()
+        if previous.get(ingredient_id) != current.get(ingredient_id)
+    )
+
+
+def update_recipe_shopping_lists(recipe_id, ingredient_ids):
+    user_ids = ShoppingList.objects.filter(
+        recipe_id=recipe_id
+    ).order_by('user_id').values_list('user_id', flat=True)
+    for batch in batched(user_ids, USERS_BATCH_SIZE):
+        update_shopping_lists(batch, ingredient_ids)
+
+
+def render_txt(shop_list):
+    for line in shop_list:
+        yield (f'{line["ingredient__name"]}, {line["total_amount"]} '
+               f'{line["ingredient__measurement_unit"]}\n')
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+def render_csv(shop_list):
+    writer = csv.writer(Echo())
+    yield writer.writerow(['Ингредиент', 'Количество', 'Единица измерения'])
+    for line in shop_list:
+        yield writer.writerow([
+            line['ingredient__name'],
+            line['total_amount'],
+            line['ingredient__measurement_unit'],
+        ])
+
+
+def read_chunks(file):
+    chunk = file.read(CHUNK_SIZE)
+    while chunk:
+        yield chunk
+        chunk = file.read(CHUNK_SIZE)
+    file.close()
+
+
+def render_pdf(shop_list):
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_CART_PDF_FONT)
+        )
+    file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    pdf = canvas.Canvas(file, pagesize=A4)
+    width, height = A4
+    pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+    y = height - PDF_MARGIN
+    for line in render_txt(shop_list):
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        pdf.drawString(PDF_MARGIN, y, line.rstrip('\n'))
+        y -= PDF_LINE_HEIGHT
+    pdf.save()
+    file.seek(0)
+    return read_chunks(file)
+
+
+FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
@@ -0,0 +1,112 @@
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import bump_version, get_user_group
+from api.ingredient_index import ingredient_index
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, RecipeTag, ShoppingList,
+    Tag,
+)
+from users.models import Follow, User
+
+CACHE_GROUPS = {
+    Ingredient: ('ingredients', 'recipes'),
+    Recipe: ('recipes',),
+    RecipeIngredient: ('recipes',),
+    RecipeTag: ('recipes',),
+    Tag: ('tags', 'recipes'),
+}
+PROFILE_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+USER_STATE = {
+    Favorite: 'user_id',
+    ShoppingList: 'user_id',
+    Follow: 'follower_id',
+}
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingList: (Recipe, 'recipe_id', 'shopping_cart_count'),
+    Recipe: (User, 'author_id', 'recipes_count'),
+    Follow: (User, 'following_id', 'followers_count'),
+}
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+def invalidate_response_cache(sender, **kwargs):
+    for group in CACHE_GROUPS[sender]:
+        transaction.on_commit(partial(bump_version, group))
+
+
+def invalidate_user_state(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        bump_version, get_user_group(getattr(instance, USER_STATE[sender]))
+    ))
+
+
+def change_counter(sender, instance, delta):
+    model, field, counter = COUNTERS[sender]
+    model.objects.filter(id=getattr(instance, field)).update(
+        **{counter: F(counter) + delta}
+    )
+
+
+def increment_counter(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_counter(sender, instance, 1)
+
+
+def decrement_counter(sender, instance, **kwargs):
+    change_counter(sender, instance, -1)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_profiles(sender, update_fields=None, **kwargs):
+    if update_fields is not None and not PROFILE_FIELDS & set(update_fields):
+        return
+    transaction.on_commit(partial(bump_version, 'users'))
+
+
+@receiver(request_finished)
+def mark_connections_idle(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.idle_since = now
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    idle_since = time.monotonic() - settings.DB_CONN_HEALTH_CHECK_IDLE
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and not connection.in_atomic_block
+            and getattr(connection, 'idle_since', 0) < idle_since
+            and not connection.is_usable()
+        ):
+            connection.close()
+
+
+def unicode_lower(value):
+    return None if value is None else str(value).lower()
+
+
+@receiver(connection_created)
+def add_unicode_lower(connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function('LOWER', 1, unicode_lower)
@@ -0,0 +1,44 @@
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+from api import feed
+from api.shopping_cart import FORMATS, get_shopping_cart
+from tasks.registry import task
+from tasks.runner import delete_expired_tasks
+
+fan_out_recipes = task(name='api.fan_out_recipes')(feed.fan_out_recipes)
+
+
+def get_exports_storage():
+    return FileSystemStorage(location=settings.EXPORTS_ROOT)
+
+
+def delete_expired_exports(storage):
+    if not storage.exists(''):
+        return
+    expired = timezone.now() - timedelta(seconds=settings.EXPORTS_TTL)
+    for name in storage.listdir('')[1]:
+        if storage.get_modified_time(name) < expired:
+            storage.delete(name)
+
+
+@task(name='api.export_shopping_cart')
+def export_shopping_cart(user_id, file_format):
+    storage = get_exports_storage()
+    delete_expired_exports(storage)
+    delete_expired_tasks()
+    render, content_type = FORMATS[file_format]
+    with tempfile.TemporaryFile() as file:
+        for chunk in render(get_shopping_cart(user_id)):
+            file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        file.seek(0)
+        name = storage.save(
+            f'shopping_list_{uuid.uuid4().hex}.{file_format}', File(file)
+        )
+    return {'file': name, 'content_type': content_type}
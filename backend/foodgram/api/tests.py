@@ -0,0 +1,1308 @@
+import base64
+import json
+import random
+import shutil
+import tempfile
+import threading
+from collections import Counter
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_delete, post_save
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.bulk import export_recipes, import_recipes
+from api.feed import fan_out_recipes
+from api.metrics import HISTOGRAMS, metrics
+from api.replicas import ReplicaRouter, choose_replica, read_database
+from api.tasks import get_exports_storage
+
+from recipes.images import RENDITIONS
+from recipes.models import (
+    Favorite, FeedEntry, Ingredient, Recipe, RecipeIngredient, RecipeTag,
+    ShoppingList, ShoppingListItem, Tag,
+)
+from tasks.backends import get_backend
+from tasks.models import Task
+from tasks.registry import task
+from tasks.runner import delete_expired_tasks, run_task
+from users.models import Follow, User
+
+
+def create_recipes(authors, tags, ingredients, number, ingredients_count):
+    last_id = Recipe.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=authors[index % len(authors)],
+            name=f'Рецепт {index}',
+            text='Описание',
+            image='images/test.png',
+            cooking_time=10,
+        )
+        for index in range(number)
+    )
+    recipes = list(Recipe.objects.filter(id__gt=last_id).order_by('id'))
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredients[(index + shift) % len(ingredients)],
+            amount=10 + shift,
+        )
+        for index, recipe in enumerate(recipes)
+        for shift in range(ingredients_count)
+    )
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe=recipe, tag=tags[index % len(tags)])
+        for index, recipe in enumerate(recipes)
+    )
+    return recipes
+
+
+def create_users(number):
+    return [
+        User.objects.create(
+            username=f'user{index}', email=f'user{index}@example.com',
+            first_name='Имя', last_name='Фамилия'
+        )
+        for index in range(number)
+    ]
+
+
+def create_tags(number):
+    return [
+        Tag.objects.create(
+            name=f'Тег {index}', color=f'#00000{index}', slug=f'tag{index}'
+        )
+        for index in range(number)
+    ]
+
+
+def create_ingredients(number):
+    return [
+        Ingredient.objects.create(
+            name=f'Ингредиент {index}', measurement_unit='г'
+        )
+        for index in range(number)
+    ]
+
+
+@override_settings(DATABASE_REPLICAS={})
+class RecipeListQueriesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_users(5)
+        cls.tags = create_tags(3)
+        cls.ingredients = create_ingredients(20)
+        recipes = create_recipes(
+            cls.users, cls.tags, cls.ingredients, 60, 5
+        )
+        user = cls.users[0]
+        Follow.objects.create(follower=user, following=cls.users[1])
+        Favorite.objects.create(user=user, recipe=recipes[0])
+        ShoppingList.objects.create(user=user, recipe=recipes[1])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assert_list_queries(self, number):
+        for limit in (6, 50):
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(number):
+                    response = self.client.get(
+                        '/api/recipes/', {'limit': limit}
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous_list_queries(self):
+        self.assert_list_queries(4)
+
+    def test_authenticated_list_queries(self):
+        self.client.force_authenticate(self.users[0])
+        self.assert_list_queries(5)
+
+
+class ReplicaRoutingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_users(2)
+        cls.recipes = create_recipes(
+            cls.users, create_tags(1), create_ingredients(2), 1, 2
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_router_reads_from_selected_database(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Recipe))
+        token = read_database.set('replica_1')
+        try:
+            self.assertEqual(router.db_for_read(Recipe), 'replica_1')
+            self.assertEqual(router.db_for_write(Recipe), DEFAULT_DB_ALIAS)
+        finally:
+            read_database.reset(token)
+
+    @override_settings(DATABASE_REPLICAS={})
+    def test_primary_without_replicas(self):
+        self.assertIsNone(choose_replica(AnonymousUser()))
+
+    @override_settings(DATABASE_REPLICAS={'replica_1': 1, 'replica_2': 3})
+    def test_replica_weights(self):
+        random.seed(1)
+        chosen = Counter(
+            choose_replica(AnonymousUser()) for _ in range(2000)
+        )
+        self.assertEqual(set(chosen), {'replica_1', 'replica_2'})
+        self.assertGreater(chosen['replica_2'], 2 * chosen['replica_1'])
+
+    @override_settings(DATABASE_REPLICAS={'replica_1': 1})
+    def test_write_pins_user_to_primary(self):
+        user, other = self.users
+        self.assertEqual(choose_replica(user), 'replica_1')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(f'/api/recipes/{self.recipes[0].id}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(choose_replica(user))
+        self.assertEqual(choose_replica(other), 'replica_1')
+
+    @override_settings(DATABASE_REPLICAS={'replica_1': 1})
+    def test_failed_write_does_not_pin(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        response = client.post('/api/recipes/0/favorite/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(choose_replica(self.users[0]), 'replica_1')
+
+
+@skipUnless(
+    settings.DATABASE_REPLICAS,
+    'Для проверки на реальной реплике задайте DB_REPLICAS'
+)
+class ReplicaQueriesTest(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        cache.clear()
+        self.replica = next(iter(settings.DATABASE_REPLICAS))
+        self.user = create_users(1)[0]
+        self.recipe = create_recipes(
+            [self.user], create_tags(1), create_ingredients(2), 1, 2
+        )[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_queries(self, method, url):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections[self.replica]) as replica:
+                response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 400)
+        return len(primary), len(replica)
+
+    def test_reads_use_replica_until_user_writes(self):
+        with override_settings(DATABASE_REPLICAS={self.replica: 1}):
+            primary, replica = self.get_queries('get', '/api/recipes/')
+            self.assertEqual(primary, 0)
+            self.assertGreater(replica, 0)
+            self.get_queries(
+                'post', f'/api/recipes/{self.recipe.id}/favorite/'
+            )
+            primary, replica = self.get_queries('get', '/api/recipes/')
+            self.assertGreater(primary, 0)
+            self.assertEqual(replica, 0)
+
+
+def get_image_data_uri(size=(8, 8)):
+    content = BytesIO()
+    Image.new('RGB', size, 'red').save(content, 'PNG')
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(content.getvalue()).decode()
+    )
+
+
+@override_settings(DATABASE_REPLICAS={})
+class RecipeImportExportTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_users(3)
+        cls.recipes = create_recipes(
+            cls.users[:2], create_tags(2), create_ingredients(6), 4, 3
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[2])
+
+    def export(self, queryset):
+        return [json.loads(line) for line in export_recipes(queryset)]
+
+    def post_records(self, *records):
+        return self.client.post(
+            '/api/recipes/bulk/',
+            '\n'.join(
+                json.dumps(record, ensure_ascii=False) for record in records
+            ).encode(),
+            content_type='application/x-ndjson'
+        )
+
+    def get_record(self, image):
+        return {
+            'name': 'Импортированный рецепт',
+            'text': 'Описание',
+            'cooking_time': 15,
+            'image': image,
+            'tags': ['tag0', 'tag1'],
+            'ingredients': [
+                {'name': 'Ингредиент 0', 'measurement_unit': 'г',
+                 'amount': 5},
+                {'name': 'Ингредиент 1', 'measurement_unit': 'г',
+                 'amount': 7},
+            ],
+        }
+
+    def test_round_trip(self):
+        records = self.export(Recipe.objects.all())
+        last_id = self.recipes[-1].id
+        result = import_recipes(
+            (json.dumps(record) for record in records), self.users[0],
+            batch_size=3, record_authors=True, renditions=False
+        )
+        self.assertEqual(
+            result, {'created': len(records), 'failed': 0, 'errors': []}
+        )
+        self.assertEqual(
+            self.export(Recipe.objects.filter(id__gt=last_id)), records
+        )
+        for user in self.users[:2]:
+            user.refresh_from_db()
+            self.assertEqual(user.recipes_count, len(records) // 2)
+
+    def test_invalid_authors_are_reported_per_line(self):
+        record = self.export(Recipe.objects.filter(id=self.recipes[0].id))[0]
+        lines = [
+            json.dumps(dict(record, author=author))
+            for author in (['user0'], {'username': 'user0'}, 'unknown')
+        ]
+        result = import_recipes(
+            lines, self.users[0], record_authors=True, renditions=False
+        )
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(
+            [error['line'] for error in result['errors']], [1, 2, 3]
+        )
+        for error in result['errors']:
+            self.assertIn('author', error['errors'])
+
+    def test_bulk_endpoint_saves_inline_images(self):
+        response = self.post_records(self.get_record(get_image_data_uri()))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        response = self.client.get(
+            '/api/recipes/export/', {'author': self.users[2].id}
+        )
+        self.assertEqual(response.status_code, 200)
+        records = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertTrue(default_storage.exists(record.pop('image')))
+        self.assertEqual(record.pop('author'), self.users[2].username)
+        expected = self.get_record(None)
+        expected.pop('image')
+        self.assertEqual(record, expected)
+
+    def test_bulk_endpoint_rejects_foreign_image_paths(self):
+        response = self.post_records(
+            self.get_record(self.recipes[0].image.name),
+            self.get_record('../foodgram/settings.py'),
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(
+            [error['line'] for error in response.data['errors']], [1, 2]
+        )
+        self.assertIn('image', response.data['errors'][0]['errors'])
+
+    @override_settings(RECIPE_BULK_MAX_BODY_SIZE=100)
+    def test_bulk_endpoint_limits_body_size(self):
+        response = self.post_records(self.get_record(get_image_data_uri()))
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Recipe.objects.filter(author=self.users[2]).exists())
+
+    def test_export_requires_authentication(self):
+        response = APIClient().get('/api/recipes/export/')
+        self.assertEqual(response.status_code, 401)
+
+
+INGREDIENT_WRITES = (
+    'INSERT INTO "recipes_recipeingredient"',
+    'UPDATE "recipes_recipeingredient"',
+    'DELETE FROM "recipes_recipeingredient"',
+)
+
+
+@override_settings(DATABASE_REPLICAS={})
+class RecipeIngredientDiffTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_users(1)[0]
+        cls.tags = create_tags(3)
+        cls.ingredients = create_ingredients(4)
+        cls.recipe = create_recipes(
+            [cls.author], cls.tags, cls.ingredients, 1, 3
+        )[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def get_rows(self):
+        return {
+            row.ingredient_id: (row.id, row.amount)
+            for row in RecipeIngredient.objects.filter(recipe=self.recipe)
+        }
+
+    def patch(self, data):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/', data, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'].split()[0] for query in queries
+            if query['sql'].startswith(INGREDIENT_WRITES)
+        ]
+
+    def test_only_changed_rows_are_written(self):
+        first, second, third, fourth = self.ingredients
+        before = self.get_rows()
+        statements = self.patch({'ingredients': [
+            {'id': first.id, 'amount': before[first.id][1]},
+            {'id': second.id, 'amount': 50},
+            {'id': fourth.id, 'amount': 5},
+        ]})
+        after = self.get_rows()
+        self.assertEqual(set(after), {first.id, second.id, fourth.id})
+        self.assertEqual(after[first.id], before[first.id])
+        self.assertEqual(after[second.id], (before[second.id][0], 50))
+        self.assertEqual(after[fourth.id][1], 5)
+        self.assertEqual(sorted(statements), ['DELETE', 'INSERT', 'UPDATE'])
+
+    def test_unchanged_ingredients_are_not_written(self):
+        before = self.get_rows()
+        statements = self.patch({'ingredients': [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, (_, amount) in before.items()
+        ]})
+        self.assertEqual(self.get_rows(), before)
+        self.assertEqual(statements, [])
+
+    def test_omitted_ingredients_and_tags_are_kept(self):
+        before = self.get_rows()
+        tags = set(self.recipe.tags.values_list('id', flat=True))
+        self.patch({'name': 'Новое название'})
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новое название')
+        self.assertEqual(self.get_rows(), before)
+        self.assertEqual(
+            set(self.recipe.tags.values_list('id', flat=True)), tags
+        )
+
+    def test_tags_are_diffed(self):
+        kept, added = self.tags[0].id, self.tags[2].id
+        RecipeTag.objects.create(recipe=self.recipe, tag=self.tags[1])
+        kept_row = RecipeTag.objects.get(recipe=self.recipe, tag_id=kept)
+        self.patch({'tags': [kept, added]})
+        self.assertEqual(
+            set(self.recipe.tags.values_list('id', flat=True)),
+            {kept, added}
+        )
+        self.assertTrue(RecipeTag.objects.filter(id=kept_row.id).exists())
+
+
+@override_settings(DATABASE_REPLICAS={}, FEED_BACKFILL_SIZE=3)
+class FeedTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.follower, cls.author, cls.other = create_users(3)
+        cls.tags = create_tags(1)
+        cls.ingredients = create_ingredients(2)
+        cls.recipes = create_recipes(
+            [cls.author, cls.other], cls.tags, cls.ingredients, 10, 1
+        )
+        cls.author_recipes = [
+            recipe.id for recipe in cls.recipes
+            if recipe.author_id == cls.author.id
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.follower)
+
+    def subscribe(self, method='post'):
+        response = getattr(self.client, method)(
+            f'/api/users/{self.author.id}/subscribe/'
+        )
+        self.assertIn(response.status_code, (200, 204))
+
+    def get_feed(self):
+        response = self.client.get('/api/recipes/feed/', {'limit': 10})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def get_entries(self):
+        return sorted(FeedEntry.objects.filter(
+            user=self.follower
+        ).values_list('recipe_id', flat=True))
+
+    def test_follow_backfills_newest_recipes(self):
+        self.subscribe()
+        newest = sorted(self.author_recipes, reverse=True)[:3]
+        self.assertEqual(self.get_entries(), sorted(newest))
+        self.assertEqual(self.get_feed(), newest)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+
+    def test_unfollow_trims_feed(self):
+        self.subscribe()
+        self.subscribe('delete')
+        self.assertEqual(self.get_entries(), [])
+        self.assertEqual(self.get_feed(), [])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+
+    def test_new_recipes_fan_out_to_followers(self):
+        self.subscribe()
+        recipe = create_recipes(
+            [self.author], self.tags, self.ingredients, 1, 1
+        )[0]
+        fan_out_recipes([recipe.id])
+        self.assertIn(recipe.id, self.get_entries())
+        self.assertEqual(self.get_feed()[0], recipe.id)
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_large_authors_are_read_without_fan_out(self):
+        self.subscribe()
+        recipe = create_recipes(
+            [self.author], self.tags, self.ingredients, 1, 1
+        )[0]
+        fan_out_recipes([recipe.id])
+        self.assertNotIn(recipe.id, self.get_entries())
+        self.assertEqual(
+            self.get_feed(),
+            sorted([*self.author_recipes, recipe.id], reverse=True)
+        )
+
+
+@override_settings(DATABASE_REPLICAS={})
+class RecipeSearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_users(1)[0]
+        cls.ingredients = create_ingredients(4)
+        recipes = create_recipes(
+            [author], create_tags(1), cls.ingredients, 5, 0
+        )
+        texts = (
+            ('Пирог с вишней', 'Сладкий пирог к чаю'),
+            ('Суп', 'Подавать с пирогом'),
+            ('Салат', 'Овощи и зелень'),
+            ('Пирог с капустой', 'Сытный'),
+            ('Омлет', 'Сладкий завтрак'),
+        )
+        for recipe, (name, text) in zip(recipes, texts):
+            Recipe.objects.filter(id=recipe.id).update(name=name, text=text)
+        cls.pie, cls.soup, cls.salad, cls.cabbage_pie, cls.omelette = (
+            recipe.id for recipe in recipes
+        )
+        first, second, third, fourth = cls.ingredients
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe_id=recipe_id, ingredient=ingredient,
+                             amount=1)
+            for recipe_id, ingredient in (
+                (cls.pie, second), (cls.pie, third),
+                (cls.soup, second), (cls.salad, third),
+                (cls.cabbage_pie, first), (cls.omelette, fourth),
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get_ids(self, **params):
+        response = self.client.get('/api/recipes/', {'limit': 10, **params})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_matches_rank_first(self):
+        found = self.get_ids(search='пирог')
+        self.assertEqual(set(found[:2]), {self.pie, self.cabbage_pie})
+        self.assertIn(self.soup, found[2:])
+        self.assertNotIn(self.salad, found)
+
+    def test_search_ignores_case(self):
+        self.assertEqual(
+            set(self.get_ids(search='ПИРОГ С ВИШНЕЙ')), {self.pie}
+        )
+
+    def test_all_search_words_must_match(self):
+        self.assertEqual(self.get_ids(search='сладкий пирог'), [self.pie])
+
+    def test_search_keeps_rank_with_cursor_pagination(self):
+        response = self.client.get('/api/recipes/', {
+            'limit': 1, 'search': 'пирог', 'pagination': 'cursor'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            response.data['results'][0]['id'], {self.pie, self.cabbage_pie}
+        )
+        self.assertIn('page=2', response.data['next'])
+
+    def test_ingredients_require_all(self):
+        first, second, third, fourth = self.ingredients
+        self.assertEqual(
+            self.get_ids(ingredients=f'{second.id},{third.id}'), [self.pie]
+        )
+        self.assertEqual(
+            self.get_ids(ingredients=str(second.id)), [self.soup, self.pie]
+        )
+        self.assertEqual(
+            self.get_ids(ingredients=f'{first.id},{fourth.id}'), []
+        )
+
+    def test_ingredients_must_be_integers(self):
+        response = self.client.get('/api/recipes/', {'ingredients': '1.5'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+
+
+@override_settings(DATABASE_REPLICAS={})
+class CounterTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author, self.reader, self.follower = create_users(3)
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            image='images/test.png', cooking_time=10
+        )
+
+    def assert_counters(self, favorites, cart, recipes, followers):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.favorites_count, self.recipe.shopping_cart_count,
+             self.author.recipes_count, self.author.followers_count),
+            (favorites, cart, recipes, followers)
+        )
+
+    def test_api_changes_update_counters(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        client.post(f'/api/users/{self.author.id}/subscribe/')
+        self.assert_counters(1, 1, 1, 1)
+        client.delete(f'/api/recipes/{self.recipe.id}/favorite/')
+        client.delete(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        client.delete(f'/api/users/{self.author.id}/subscribe/')
+        self.assert_counters(0, 0, 1, 0)
+
+    def test_cascades_update_counters(self):
+        for user in (self.reader, self.follower):
+            Favorite.objects.create(user=user, recipe=self.recipe)
+            ShoppingList.objects.create(user=user, recipe=self.recipe)
+            Follow.objects.create(follower=user, following=self.author)
+        self.assert_counters(2, 2, 1, 2)
+        self.reader.delete()
+        self.assert_counters(1, 1, 1, 1)
+        Favorite.objects.all().delete()
+        Follow.objects.all().delete()
+        self.assert_counters(0, 1, 1, 0)
+        Recipe.objects.all().delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 0)
+
+
+@override_settings(DATABASE_REPLICAS={})
+class SubscriptionsQueriesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_users(7)
+        create_recipes(
+            cls.users[1:], create_tags(2), create_ingredients(4), 30, 2
+        )
+        for author in cls.users[1:]:
+            author.recipes_count = 5
+            author.save(update_fields=['recipes_count'])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def get_subscriptions(self, number):
+        cache.clear()
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            response = self.client.get(
+                '/api/users/subscriptions/',
+                {'recipes_limit': 2, 'limit': 6}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), number)
+        return response, len(queries)
+
+    def test_queries_do_not_grow_with_authors(self):
+        for author in self.users[1:3]:
+            Follow.objects.create(follower=self.users[0], following=author)
+        _, few = self.get_subscriptions(2)
+        for author in self.users[3:]:
+            Follow.objects.create(follower=self.users[0], following=author)
+        response, many = self.get_subscriptions(6)
+        self.assertEqual(few, many)
+        self.assertEqual(many, 3)
+        for author in response.data['results']:
+            self.assertEqual(len(author['recipes']), 2)
+            self.assertEqual(author['recipes_count'], 5)
+            self.assertTrue(author['is_subscribed'])
+        self.assertEqual(
+            [
+                recipe['id']
+                for recipe in response.data['results'][-1]['recipes']
+            ],
+            list(Recipe.objects.filter(author=self.users[1]).values_list(
+                'id', flat=True
+            )[:2])
+        )
+
+
+@override_settings(DATABASE_REPLICAS={}, RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.users = create_users(2)
+        self.tags = create_tags(2)
+        self.ingredients = create_ingredients(3)
+        self.recipes = create_recipes(
+            self.users, self.tags, self.ingredients, 3, 2
+        )
+        self.client = APIClient()
+
+    def get(self, url, status=200, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def test_reads_are_cached_until_their_models_change(self):
+        for url, change in (
+            ('/api/tags/', lambda: Tag.objects.create(
+                name='Новый', color='#ffffff', slug='new'
+            )),
+            ('/api/ingredients/?name=Ингр', lambda: Ingredient.objects.create(
+                name='Ингредиент новый', measurement_unit='г'
+            )),
+            ('/api/recipes/?limit=6', lambda: Recipe.objects.filter(
+                id=self.recipes[0].id
+            ).first().save()),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url)['X-Cache'], 'MISS')
+                self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+                change()
+                self.assertEqual(self.get(url)['X-Cache'], 'MISS')
+
+    def test_ingredient_changes_reach_the_list(self):
+        url = '/api/ingredients/?name=Ингр'
+        self.assertEqual(len(self.get(url).data), 3)
+        self.ingredients[0].name = 'Соль'
+        self.ingredients[0].save()
+        self.assertEqual(len(self.get(url).data), 2)
+
+    def test_user_state_changes_keep_anonymous_cache(self):
+        url = '/api/recipes/?limit=6'
+        self.get(url)
+        Favorite.objects.create(user=self.users[0], recipe=self.recipes[0])
+        Follow.objects.create(follower=self.users[0], following=self.users[1])
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+
+    def test_cached_response_answers_conditional_get(self):
+        url = '/api/recipes/?limit=6'
+        etag = self.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(url, status=304, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response['ETag'], etag)
+        self.recipes[0].save()
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_receivers_are_scoped_to_cached_models(self):
+        for signal in (post_save, post_delete):
+            self.assertFalse(signal.has_listeners(FeedEntry))
+            self.assertFalse(signal.has_listeners(ShoppingListItem))
+        FeedEntry.objects.create(
+            user=self.users[0], author=self.users[1], recipe=self.recipes[1]
+        )
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            FeedEntry.objects.all().delete()
+        self.assertEqual(
+            [query['sql'] for query in queries if query['sql'] != 'BEGIN'],
+            ['DELETE FROM "recipes_feedentry"']
+        )
+
+
+@override_settings(DATABASE_REPLICAS={}, RESPONSE_CACHE_ENABLED=True)
+class ConditionalGetTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.users = create_users(2)
+        self.tags = create_tags(1)
+        self.recipe = create_recipes(
+            self.users[:1], self.tags, create_ingredients(2), 1, 2
+        )[0]
+        self.url = f'/api/recipes/{self.recipe.id}/'
+        self.client = self.get_client(self.users[0])
+
+    def get_client(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+        )
+        return client
+
+    def get_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_detail_answers_if_none_match(self):
+        etag = self.get_etag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.recipe.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_detail_answers_if_modified_since(self):
+        client = APIClient()
+        response = client.get(self.url)
+        last_modified = response['Last-Modified']
+        response = client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_follows_own_state_and_related_models(self):
+        etag = self.get_etag()
+        self.get_client(self.users[1]).post(f'{self.url}favorite/')
+        self.assertEqual(self.get_etag(), etag)
+        self.client.post(f'{self.url}favorite/')
+        favorited = self.get_etag()
+        self.assertNotEqual(favorited, etag)
+        self.assertTrue(self.client.get(self.url).data['is_favorited'])
+        self.tags[0].name = 'Новое имя'
+        self.tags[0].save()
+        self.assertNotEqual(self.get_etag(), favorited)
+
+    def test_list_etag_changes_with_recipes(self):
+        url = '/api/recipes/?limit=6'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Recipe.objects.create(
+            author=self.users[1], name='Новый рецепт', text='Описание',
+            image='images/test.png', cooking_time=5
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+@override_settings(DATABASE_REPLICAS={})
+class CursorPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_users(8)
+        cls.recipes = create_recipes(
+            cls.users[1:3], create_tags(2), create_ingredients(3), 13, 2
+        )
+        for author in cls.users[1:]:
+            Follow.objects.create(follower=cls.users[0], following=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def collect(self, url, params):
+        response = self.client.get(url, params)
+        pages = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([item['id'] for item in response.data['results']])
+            if not response.data['next']:
+                return response, pages
+            self.assertIn('cursor=', response.data['next'])
+            response = self.client.get(response.data['next'])
+
+    def test_recipes_are_paged_by_cursor(self):
+        response, pages = self.collect(
+            '/api/recipes/', {'pagination': 'cursor', 'limit': 5}
+        )
+        self.assertEqual([len(page) for page in pages], [5, 5, 3])
+        self.assertEqual(
+            sum(pages, []), [recipe.id for recipe in self.recipes[::-1]]
+        )
+        self.assertEqual(response.data['count'], 13)
+        self.assertNotIn('page=', response.data['previous'])
+
+    def test_cursor_keeps_filters(self):
+        _, pages = self.collect('/api/recipes/', {
+            'pagination': 'cursor', 'limit': 2, 'author': self.users[1].id,
+        })
+        self.assertEqual(
+            sum(pages, []),
+            [
+                recipe.id for recipe in self.recipes[::-1]
+                if recipe.author_id == self.users[1].id
+            ]
+        )
+
+    def test_subscriptions_are_paged_by_cursor(self):
+        _, pages = self.collect('/api/users/subscriptions/', {
+            'pagination': 'cursor', 'limit': 3, 'recipes_limit': 1,
+        })
+        self.assertEqual(
+            sum(pages, []), [user.id for user in self.users[:0:-1]]
+        )
+
+    def test_page_numbers_remain_the_default(self):
+        response = self.client.get('/api/recipes/', {'limit': 5, 'page': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIn('page=2', response.data['previous'])
+
+
+@override_settings(DATABASE_REPLICAS={})
+class TagsFilterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_users(1)
+        cls.tags = create_tags(3)
+        cls.recipes = create_recipes(
+            cls.users, cls.tags, create_ingredients(2), 4, 1
+        )
+        RecipeTag.objects.create(recipe=cls.recipes[0], tag=cls.tags[1])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get_ids(self, params):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_any_tag_matches_once(self):
+        self.assertEqual(
+            self.get_ids({'tags': ['tag0', 'tag1'], 'limit': 10}),
+            [self.recipes[3].id, self.recipes[1].id, self.recipes[0].id]
+        )
+
+    def test_all_tags_must_match(self):
+        self.assertEqual(
+            self.get_ids({
+                'tags': ['tag0', 'tag1'], 'tags_mode': 'all', 'limit': 10,
+            }),
+            [self.recipes[0].id]
+        )
+
+    def test_unknown_tag_is_rejected(self):
+        response = self.client.get('/api/recipes/', {'tags': 'missing'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_filter_uses_exists_without_join(self):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            self.get_ids({'tags': ['tag0', 'tag1'], 'limit': 10})
+        recipe_queries = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT "recipes_recipe"."id"')
+        ]
+        self.assertTrue(recipe_queries)
+        for sql in recipe_queries:
+            self.assertIn('EXISTS', sql)
+            self.assertNotIn('JOIN "recipes_recipetag"', sql)
+            self.assertNotIn('DISTINCT', sql)
+
+
+@override_settings(DATABASE_REPLICAS={})
+class UserFlagFiltersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_users(2)
+        cls.tags = create_tags(2)
+        cls.recipes = create_recipes(
+            cls.users, cls.tags, create_ingredients(2), 6, 1
+        )
+        user = cls.users[0]
+        for recipe in cls.recipes[:4]:
+            Favorite.objects.create(user=user, recipe=recipe)
+        for recipe in cls.recipes[2:]:
+            ShoppingList.objects.create(user=user, recipe=recipe)
+        Favorite.objects.create(user=cls.users[1], recipe=cls.recipes[5])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def get_ids(self, **params):
+        response = self.client.get('/api/recipes/', dict(params, limit=10))
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def ids(self, *indexes):
+        return {self.recipes[index].id for index in indexes}
+
+    def test_flags_compose(self):
+        self.assertEqual(self.get_ids(is_favorited=1), self.ids(0, 1, 2, 3))
+        self.assertEqual(
+            self.get_ids(is_in_shopping_cart=1), self.ids(2, 3, 4, 5)
+        )
+        self.assertEqual(
+            self.get_ids(is_favorited=1, is_in_shopping_cart=1),
+            self.ids(2, 3)
+        )
+        self.assertEqual(
+            self.get_ids(is_favorited=0, is_in_shopping_cart=1),
+            self.ids(4, 5)
+        )
+
+    def test_flags_compose_with_other_filters(self):
+        self.assertEqual(
+            self.get_ids(
+                is_favorited=1, is_in_shopping_cart=1, tags='tag0',
+                author=self.users[0].id
+            ),
+            self.ids(2)
+        )
+
+    def test_anonymous_flags_match_nothing(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.get_ids(is_favorited=1), set())
+        self.assertEqual(self.get_ids(is_favorited=0), self.ids(*range(6)))
+
+
+@override_settings(
+    DATABASE_REPLICAS={},
+    TASKS_BACKEND='tasks.backends.ImmediateBackend'
+)
+class RenditionsTest(TransactionTestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        cache.clear()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        self.user = create_users(1)[0]
+        self.tag = create_tags(1)[0]
+        self.ingredient = create_ingredients(1)[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_renditions(self, recipe_id):
+        response = self.client.get(f'/api/recipes/{recipe_id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['renditions']
+
+    def assert_renditions(self, renditions, size):
+        self.assertEqual(set(renditions), set(RENDITIONS))
+        for rendition, urls in renditions.items():
+            self.assertEqual(set(urls), {'webp', 'jpeg'})
+            for url in urls.values():
+                self.assertTrue(url.startswith('http://testserver/media/'))
+                name = url[len('http://testserver/media/'):]
+                with default_storage.open(name) as file:
+                    image = Image.open(file)
+                    expected = tuple(
+                        min(side, limit)
+                        for side, limit in zip(size, RENDITIONS[rendition])
+                    )
+                    self.assertEqual(max(image.size), max(expected))
+
+    def test_upload_builds_renditions(self):
+        response = self.client.post('/api/recipes/', {
+            'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+            'tags': [self.tag.id],
+            'ingredients': [{'id': self.ingredient.id, 'amount': 5}],
+            'image': get_image_data_uri((800, 600)),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data['renditions'])
+        self.assert_renditions(
+            self.get_renditions(response.data['id']), (800, 600)
+        )
+
+    def test_command_backfills_existing_recipes(self):
+        content = BytesIO()
+        Image.new('RGB', (300, 200), 'blue').save(content, 'PNG')
+        image = default_storage.save('images/old.png', content)
+        recipe = Recipe.objects.create(
+            author=self.user, name='Старый рецепт', text='Описание',
+            image=image, cooking_time=10
+        )
+        self.assertIsNone(self.get_renditions(recipe.id))
+        call_command('build_renditions', stdout=StringIO())
+        self.assert_renditions(self.get_renditions(recipe.id), (300, 200))
+
+
+@override_settings(
+    DATABASE_REPLICAS={},
+    TASKS_BACKEND='tasks.backends.ImmediateBackend'
+)
+class ExportTaskTest(TransactionTestCase):
+
+    def setUp(self):
+        exports_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, exports_root, ignore_errors=True)
+        exports_override = override_settings(EXPORTS_ROOT=exports_root)
+        exports_override.enable()
+        self.addCleanup(exports_override.disable)
+        cache.clear()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        self.user, self.other = create_users(2)
+        tags = create_tags(1)
+        ingredients = create_ingredients(3)
+        recipe = create_recipes([self.user], tags, ingredients, 1, 3)[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(response.status_code, 201)
+
+    def export(self, file_format='csv'):
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/',
+            {'file_format': file_format, 'async': 1}
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.data['id']
+
+    def test_export_task_finishes_with_download_url(self):
+        task_id = self.export()
+        response = self.client.get(f'/api/tasks/{task_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], Task.SUCCESS)
+        self.assertEqual(response.data['result'], {
+            'url': f'http://testserver/api/tasks/{task_id}/download/',
+            'content_type': 'text/csv; charset=utf-8',
+        })
+
+    def test_download_matches_synchronous_export(self):
+        task_id = self.export()
+        response = self.client.get(f'/api/tasks/{task_id}/download/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        content = b''.join(response.streaming_content)
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', {'file_format': 'csv'}
+        )
+        self.assertEqual(content, b''.join(response.streaming_content))
+        self.assertEqual(len(content.decode().splitlines()), 4)
+
+    def test_other_user_cannot_see_task(self):
+        task_id = self.export()
+        self.client.force_authenticate(self.other)
+        for url in (f'/api/tasks/{task_id}/',
+                    f'/api/tasks/{task_id}/download/'):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_expired_export_is_not_found(self):
+        task_id = self.export()
+        result = json.loads(Task.objects.get(id=task_id).result)
+        get_exports_storage().delete(result['file'])
+        response = self.client.get(f'/api/tasks/{task_id}/download/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            response.data['detail'],
+            'Файл не найден или срок его хранения истёк'
+        )
+
+    @override_settings(TASKS_TTL=60)
+    def test_expired_tasks_are_deleted(self):
+        finished, recent = self.export(), self.export()
+        pending = Task.objects.create(name='api.export_shopping_cart')
+        Task.objects.filter(id__in=[finished, pending.id]).update(
+            updated=timezone.now() - timedelta(seconds=120)
+        )
+        self.assertEqual(delete_expired_tasks(), 1)
+        self.assertEqual(
+            {str(task_id) for task_id in Task.objects.values_list(
+                'id', flat=True
+            )},
+            {recent, str(pending.id)}
+        )
+
+
+release = threading.Event()
+
+
+@task(name='api.tests.wait_for_release', timeout=0.2)
+def wait_for_release():
+    return release.wait(5)
+
+
+class TaskTimeoutTest(TransactionTestCase):
+
+    def setUp(self):
+        release.clear()
+        self.addCleanup(release.set)
+
+    def run_and_get(self, in_thread):
+        task_id = Task.objects.create(name=wait_for_release.name).id
+        with self.assertLogs('tasks.runner', 'ERROR'):
+            if in_thread:
+                thread = threading.Thread(target=run_task, args=[task_id])
+                thread.start()
+                thread.join()
+            else:
+                run_task(task_id)
+        return Task.objects.get(id=task_id)
+
+    def test_timeout_in_main_thread(self):
+        task_object = self.run_and_get(in_thread=False)
+        self.assertEqual(task_object.status, Task.FAILURE)
+        self.assertEqual(task_object.attempts, 1)
+        self.assertIn('TaskTimeoutError', task_object.error)
+
+    def test_timeout_in_worker_thread(self):
+        task_object = self.run_and_get(in_thread=True)
+        self.assertEqual(task_object.status, Task.FAILURE)
+        self.assertEqual(task_object.attempts, 1)
+        self.assertIn('TaskTimeoutError', task_object.error)
+
+
+@override_settings(DATABASE_REPLICAS={})
+class MetricsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_users(1)[0]
+        self.client = APIClient()
+
+    def get_requests(self, view, method='GET', status='200'):
+        return metrics.snapshot()['requests'].get((view, method, status), 0)
+
+    def get_histogram(self, name, view, method='GET'):
+        return metrics.snapshot()['histograms'].get(
+            (name, view, method), [0] * (len(HISTOGRAMS[name][1]) + 2)
+        )
+
+    def test_request_is_recorded_with_query_count(self):
+        create_tags(3)
+        requests = self.get_requests('tag-list')
+        queries = self.get_histogram('db_queries', 'tag-list')
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as context:
+            response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_requests('tag-list'), requests + 1)
+        series = self.get_histogram('db_queries', 'tag-list')
+        self.assertEqual(sum(series[:-1]), sum(queries[:-1]) + 1)
+        self.assertEqual(series[-1], queries[-1] + len(context))
+        for name in HISTOGRAMS:
+            self.assertEqual(
+                sum(self.get_histogram(name, 'tag-list')[:-1]),
+                requests + 1
+            )
+
+    def test_streaming_response_is_recorded_after_content(self):
+        view = 'recipe-download-shopping-cart'
+        self.client.force_authenticate(self.user)
+        requests = self.get_requests(view)
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_requests(view), requests)
+        b''.join(response.streaming_content)
+        self.assertEqual(self.get_requests(view), requests + 1)
+        self.assertGreater(
+            self.get_histogram('db_queries', view)[-1], 0
+        )
+
+    def test_endpoint_renders_collected_metrics(self):
+        self.client.get('/api/tags/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn(
+            'foodgram_requests_total{view="tag-list",method="GET",'
+            'status="200"}',
+            content
+        )
+        self.assertIn(
+            'foodgram_db_queries_bucket{view="tag-list",method="GET",'
+            'le="+Inf"}',
+            content
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'])
+    def test_endpoint_is_restricted(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(
+            self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code,
+            200
+        )
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
@@ -0,0 +1,5 @@
+from rest_framework.throttling import UserRateThrottle
+
+
+class RecipeExportThrottle(UserRateThrottle):
+    scope = 'recipe-export'
@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from api.views import (
     FollowUnfollowViewSet, IngredientViewSet, RecipeViewSet, TagViewSet,
+    TaskViewSet,
 )
 
 
@@ -10,6 +11,7 @@ router_v1 = DefaultRouter()
 router_v1.register('ingredients', IngredientViewSet)
 router_v1.register('recipes', RecipeViewSet)
 router_v1.register('tags', TagViewSet)
+router_v1.register('tasks', TaskViewSet)
 router_v1.register('users', FollowUnfollowViewSet, basename='subscription')
 
 urlpatterns = [
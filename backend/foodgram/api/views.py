@@ -1,41 +1,123 @@
+import json
+from functools import partial
+
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    BooleanField, OuterRef, Prefetch, Subquery, Value,
+)
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
-from rest_framework import permissions, status, viewsets
+from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from api.filters import IngredientFilter, ResipeFilter
+from api.bulk import export_recipes, import_recipes
+from api.cache import AnonymousCacheMixin, ConditionalGetMixin
+from api.feed import backfill_feed, get_feed_filter, trim_feed
+from api.filters import ResipeFilter
+from api.ingredient_index import ingredient_index
+from api.pagination import KeysetPagination
 from api.permissions import IsAuthor, ReadOnly
+from api.replicas import ReplicaReadMixin
 from api.serializers import (
     FollowUnfollowSerializer, IngredientSerializer, ReadRecipeSerializer,
-    ShortRecipeSerializer, TagSerializer, WriteRecipeSerializer,
+    ShortRecipeSerializer, TagSerializer, TaskSerializer,
+    WriteRecipeSerializer,
+)
+from api.shopping_cart import (
+    FORMATS, change_cart_recipe, get_shopping_cart, lock_recipe,
+    update_shopping_lists,
 )
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingList, Tag
+from api.tasks import export_shopping_cart, get_exports_storage
+from api.throttling import RecipeExportThrottle
+from recipes.images import delete_image_files
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingList, Tag,
+)
+from tasks.models import Task
 from users.models import Follow, User
 
 
 def add_or_remove_from_list(list_model, request, pk):
     user = request.user
     recipe = get_object_or_404(Recipe, id=pk)
+    in_cart = list_model is ShoppingList
     if request.method == 'POST':
-        list_model.objects.create(user=user, recipe=recipe)
+        with transaction.atomic():
+            if in_cart:
+                lock_recipe(recipe.id)
+            list_model.objects.create(user=user, recipe=recipe)
+            if in_cart:
+                change_cart_recipe(recipe.id, [user.id])
         serializer = ShortRecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     if request.method == 'DELETE':
-        list_model.objects.filter(user=user, recipe=recipe).delete()
+        with transaction.atomic():
+            if in_cart:
+                lock_recipe(recipe.id)
+            deleted, _ = list_model.objects.filter(
+                user=user, recipe=recipe
+            ).delete()
+            if deleted and in_cart:
+                change_cart_recipe(recipe.id, [user.id])
         return Response(status=status.HTTP_204_NO_CONTENT)
     return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+def get_authors_with_recipes(request):
+    recipes = Recipe.objects.only(
+        'id', 'author_id', 'name', 'image', 'cooking_time',
+        'renditions_ready'
+    )
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit and recipes_limit.isdigit():
+        recipes = recipes.filter(id__in=Subquery(
+            Recipe.objects.filter(
+                author=OuterRef('author')
+            ).values('id')[:int(recipes_limit)]
+        ))
+    return User.objects.annotate(
+        is_subscribed=Value(True, output_field=BooleanField()),
+    ).prefetch_related(
+        Prefetch('recipe_set', queryset=recipes, to_attr='short_recipes')
+    )
+
+
+class RecipeViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                    AnonymousCacheMixin, viewsets.ModelViewSet):
+    cache_groups = ('recipes', 'users')
     queryset = Recipe.objects.all()
     permission_classes = [IsAuthor | ReadOnly]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = ResipeFilter
 
+    def get_queryset(self):
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        ).defer(
+            'search_vector', 'ingredient_ids'
+        ).with_user_flags(self.request.user)
+
+    def get_serializer(self, *args, **kwargs):
+        user = self.request.user
+        if args and user.is_authenticated:
+            recipes = args[0] if kwargs.get('many') else [args[0]]
+            kwargs['context'] = self.get_serializer_context()
+            kwargs['context']['subscriptions'] = set(
+                Follow.objects.filter(
+                    follower=user,
+                    following__in={recipe.author_id for recipe in recipes}
+                ).values_list('following_id', flat=True)
+            )
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_class(self):
         if self.request.method in ['POST', 'PATCH']:
             return WriteRecipeSerializer
@@ -44,6 +126,21 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            lock_recipe(instance.id)
+            user_ids = list(ShoppingList.objects.filter(
+                recipe=instance
+            ).values_list('user_id', flat=True))
+            ingredient_ids = list(RecipeIngredient.objects.filter(
+                recipe=instance
+            ).values_list('ingredient_id', flat=True))
+            instance.delete()
+            update_shopping_lists(user_ids, ingredient_ids)
+            transaction.on_commit(
+                partial(delete_image_files, instance.image.name)
+            )
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -68,28 +165,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthor, ]
     )
     def download_shopping_cart(self, request):
-        shop_list = ShoppingList.objects.filter(
-            user=request.user
-        ).values(
-            'recipe__ingredients__name',
-            'recipe__ingredients__measurement_unit'
-        ).annotate(
-            total_amount=Sum('recipe__recipeingredient__amount')
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in FORMATS:
+            return Response(
+                {'file_format': f'Доступные форматы: {", ".join(FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if request.query_params.get('async') == '1':
+            task = export_shopping_cart.delay(
+                request.user.id, file_format, user=request.user
+            )
+            return Response(
+                TaskSerializer(task).data,
+                status=status.HTTP_202_ACCEPTED
+            )
+        render, content_type = FORMATS[file_format]
+        response = StreamingHttpResponse(
+            render(get_shopping_cart(request.user)),
+            content_type=content_type
         )
-        data = []
-        for line in shop_list:
-            name = line['recipe__ingredients__name']
-            amount = line['total_amount']
-            measurement_unit = line['recipe__ingredients__measurement_unit']
-            data.append(f'{name}, {amount} {measurement_unit}')
-        response_context = '\n'.join(data)
-        response = HttpResponse(response_context, content_type='text/plain')
         response['Content-Disposition'] = ('attachment;'
-                                           'filename=shopping_list.txt')
+                                           f'filename=shopping_list.'
+                                           f'{file_format}')
         return response
 
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='bulk',
+        permission_classes=[permissions.IsAuthenticated, ]
+    )
+    def bulk_endpoint(self, request):
+        max_size = settings.RECIPE_BULK_MAX_BODY_SIZE
+        body = request.stream.read(max_size + 1) if request.stream else b''
+        if len(body) > max_size:
+            return Response(
+                {'errors': f'Размер запроса больше {max_size} байт'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        lines = body.splitlines()
+        if len(lines) > settings.RECIPE_BULK_MAX_RECORDS:
+            return Response(
+                {'errors': 'Не более '
+                           f'{settings.RECIPE_BULK_MAX_RECORDS} рецептов '
+                           'за запрос'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        result = import_recipes(
+            (line.decode('utf-8') for line in lines), request.user
+        )
+        return Response(
+            result,
+            status=(
+                status.HTTP_201_CREATED if result['created'] or not lines
+                else status.HTTP_400_BAD_REQUEST
+            )
+        )
+
+    @action(
+        detail=False,
+        url_path='feed',
+        permission_classes=[permissions.IsAuthenticated, ]
+    )
+    def feed_endpoint(self, request):
+        paginator = KeysetPagination()
+        recipes = paginator.paginate_queryset(
+            self.get_queryset().filter(get_feed_filter(request.user)),
+            request,
+            view=self
+        )
+        serializer = self.get_serializer(recipes, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        url_path='export',
+        permission_classes=[permissions.IsAuthenticated, ],
+        throttle_classes=[RecipeExportThrottle, ]
+    )
+    def export_endpoint(self, request):
+        return StreamingHttpResponse(
+            export_recipes(self.filter_queryset(Recipe.objects.all())),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+
 
-class FollowUnfollowViewSet(UserViewSet):
+class FollowUnfollowViewSet(ReplicaReadMixin, UserViewSet):
     queryset = User.objects.all()
     serializer_class = FollowUnfollowSerializer
     permission_classes = [permissions.IsAuthenticated, ]
@@ -104,13 +265,21 @@ class FollowUnfollowViewSet(UserViewSet):
         user = request.user
         following = get_object_or_404(User, id=id)
         if request.method == 'POST':
-            Follow.objects.create(follower=user, following=following)
+            with transaction.atomic():
+                Follow.objects.create(follower=user, following=following)
+                backfill_feed(user.id, following.id)
             serializer = FollowUnfollowSerializer(
-                following, context={'request': request}
+                get_authors_with_recipes(request).get(id=following.id),
+                context={'request': request}
             )
             return Response(serializer.data, status=status.HTTP_200_OK)
         if request.method == 'DELETE':
-            Follow.objects.filter(follower=user, following=following).delete()
+            with transaction.atomic():
+                deleted, _ = Follow.objects.filter(
+                    follower=user, following=following
+                ).delete()
+                if deleted:
+                    trim_feed(user.id, following.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
@@ -120,7 +289,9 @@ class FollowUnfollowViewSet(UserViewSet):
         permission_classes=[IsAuthor, ],
     )
     def subscriptions_endpoint(self, request):
-        subscriptions = User.objects.filter(following__follower=request.user)
+        subscriptions = get_authors_with_recipes(request).filter(
+            following__follower=request.user
+        )
         queryset = self.paginate_queryset(subscriptions)
         serializer = FollowUnfollowSerializer(
             queryset, many=True, context={'request': request}
@@ -128,15 +299,51 @@ class FollowUnfollowViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReplicaReadMixin, AnonymousCacheMixin,
+                 viewsets.ReadOnlyModelViewSet):
+    cache_groups = ('tags',)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [ReadOnly, ]
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, AnonymousCacheMixin,
+                        viewsets.ReadOnlyModelViewSet):
+    cache_groups = ('ingredients',)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [ReadOnly, ]
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
+    pagination_class = None
+
+    def list(self, request):
+        return Response(
+            ingredient_index.search(request.query_params.get('name', ''))
+        )
+
+
+class TaskViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    queryset = Task.objects.all()
+    serializer_class = TaskSerializer
+
+    def get_queryset(self):
+        return Task.objects.filter(user=self.request.user)
+
+    @action(detail=True, url_path='download')
+    def download(self, request, pk):
+        task = self.get_object()
+        result = (
+            json.loads(task.result)
+            if task.status == Task.SUCCESS and task.result else {}
+        )
+        storage = get_exports_storage()
+        if 'file' not in result or not storage.exists(result['file']):
+            return Response(
+                {'detail': 'Файл не найден или срок его хранения истёк'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return FileResponse(
+            storage.open(result['file']),
+            as_attachment=True,
+            filename=result['file'],
+            content_type=result['content_type']
+        )
@@ -0,0 +1,35 @@
+import argparse
+import json
+
+METRICS = ('rps', 'p50_ms', 'p99_ms')
+
+
+def change(before, after):
+    if not before or after is None:
+        return ''
+    return f'{(after - before) / before * 100:+.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Сравнение двух отчётов load_test.py.'
+    )
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    options = parser.parse_args()
+    with open(options.baseline) as file:
+        baseline = json.load(file)
+    with open(options.current) as file:
+        current = json.load(file)
+    for url in sorted(set(baseline) | set(current)):
+        print(url)
+        for metric in METRICS:
+            before = baseline.get(url, {}).get(metric)
+            after = current.get(url, {}).get(metric)
+            print(
+                f'  {metric:>7}: {before} -> {after} {change(before, after)}'
+            )
+
+
+if __name__ == '__main__':
+    main()
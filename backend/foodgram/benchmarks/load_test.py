@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+CHUNK_SIZE = 16 * 1024
+SLOW_PIECES = 10
+PERCENTILES = (50, 90, 99)
+
+
+def get_path(url):
+    parts = urlsplit(url)
+    return f'{parts.path}?{parts.query}' if parts.query else parts.path
+
+
+async def fetch(url, headers, slow_delay=0):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, parts.port or 80
+    )
+    payload = '\r\n'.join((
+        f'GET {get_path(url)} HTTP/1.1',
+        f'Host: {parts.netloc}',
+        'Connection: close',
+        *headers,
+        '',
+        '',
+    )).encode()
+    if slow_delay:
+        step = len(payload) // SLOW_PIECES + 1
+        for start in range(0, len(payload), step):
+            writer.write(payload[start:start + step])
+            await writer.drain()
+            await asyncio.sleep(slow_delay / SLOW_PIECES)
+    else:
+        writer.write(payload)
+    status_line = await reader.readline()
+    while await reader.read(CHUNK_SIZE):
+        if slow_delay:
+            await asyncio.sleep(slow_delay / SLOW_PIECES)
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def client(urls, headers, deadline, results, slow_delay=0):
+    number = 0
+    while time.monotonic() < deadline:
+        url = urls[number % len(urls)]
+        number += 1
+        started = time.monotonic()
+        try:
+            status = await fetch(url, headers, slow_delay)
+        except (OSError, ValueError, IndexError):
+            status = None
+        results.append((url, status, time.monotonic() - started))
+
+
+def percentile(values, percent):
+    return values[min(len(values) - 1, len(values) * percent // 100)]
+
+
+def summarize(results, duration):
+    report = {}
+    for url in sorted({url for url, _, _ in results}):
+        latencies = sorted(
+            latency for result_url, status, latency in results
+            if result_url == url and status and status < 500
+        )
+        errors = sum(
+            1 for result_url, status, _ in results
+            if result_url == url and (not status or status >= 500)
+        )
+        report[get_path(url)] = {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': round(len(latencies) / duration, 1),
+            **{
+                f'p{percent}_ms': round(
+                    percentile(latencies, percent) * 1000, 1
+                ) if latencies else None
+                for percent in PERCENTILES
+            },
+        }
+    return report
+
+
+async def run(options):
+    headers = [
+        f'Authorization: Token {options.token}'
+    ] if options.token else []
+    deadline = time.monotonic() + options.duration
+    results = []
+    clients = [
+        client(options.urls, headers, deadline, results)
+        for _ in range(options.concurrency)
+    ]
+    clients.extend(
+        client(
+            options.slow_urls or options.urls, headers, deadline, [],
+            options.slow_delay
+        )
+        for _ in range(options.slow_clients)
+    )
+    await asyncio.gather(*clients)
+    return summarize(results, options.duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Нагрузочный тест GET-эндпоинтов API.'
+    )
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--token')
+    parser.add_argument('--slow-clients', type=int, default=0)
+    parser.add_argument('--slow-delay', type=float, default=2)
+    parser.add_argument('--slow-url', dest='slow_urls', action='append')
+    parser.add_argument('--output')
+    options = parser.parse_args()
+    report = asyncio.get_event_loop().run_until_complete(run(options))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if options.output:
+        with open(options.output, 'w') as file:
+            file.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
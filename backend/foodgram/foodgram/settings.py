@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
+    'tasks.apps.TasksConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.replicas.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -95,10 +98,92 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+            'DB_POOL_MODE'
+        ) == 'pgbouncer',
     }
 }
 
+DB_CONN_HEALTH_CHECKS = os.getenv(
+    'DB_CONN_HEALTH_CHECKS', default='True'
+) == 'True'
+DB_CONN_HEALTH_CHECK_IDLE = int(
+    os.getenv('DB_CONN_HEALTH_CHECK_IDLE', default=30)
+)
+
+DATABASE_REPLICAS = {}
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', default='').split(','))
+):
+    location, _, weight = replica.partition('@')
+    host, _, port = location.partition(':')
+    alias = f'replica_{number + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DATABASES[alias]['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = location
+    DATABASE_REPLICAS[alias] = int(weight or 1)
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', default=5))
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'OPTIONS': {
+                'REDIS_CLIENT_CLASS': os.getenv(
+                    'REDIS_CLIENT_CLASS', default='redis.client.StrictRedis'
+                ),
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+TASKS_BACKEND = os.getenv(
+    'TASKS_BACKEND', default='tasks.backends.ThreadPoolBackend'
+)
+TASKS_BROKER_URL = os.getenv('TASKS_BROKER_URL', default=os.getenv('REDIS_URL'))
+TASKS_WORKERS = int(os.getenv('TASKS_WORKERS', default=4))
+TASKS_TIMEOUT = int(os.getenv('TASKS_TIMEOUT', default=300))
+TASKS_MAX_RETRIES = int(os.getenv('TASKS_MAX_RETRIES', default=3))
+TASKS_RETRY_DELAY = int(os.getenv('TASKS_RETRY_DELAY', default=5))
+TASKS_TTL = int(os.getenv('TASKS_TTL', default=7 * 24 * 60 * 60))
+
+RESPONSE_CACHE_ENABLED = os.getenv(
+    'RESPONSE_CACHE_ENABLED', default=str(bool(os.getenv('REDIS_URL')))
+) == 'True'
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=600))
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='True') == 'True'
+METRICS_SLOW_REQUEST_SECONDS = float(
+    os.getenv('METRICS_SLOW_REQUEST_SECONDS', default=1)
+)
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', default=10))
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', default='127.0.0.1,::1'
+).split(',')
+
+PAGINATION_APPROXIMATE_COUNT = os.getenv(
+    'PAGINATION_APPROXIMATE_COUNT', default='True'
+) == 'True'
+PAGINATION_APPROXIMATE_THRESHOLD = 10000
+PAGINATION_COUNT_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_TIMEOUT', default=60)
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -107,6 +192,9 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.LimitPagePagination',
+    'DEFAULT_THROTTLE_RATES': {
+        'recipe-export': os.getenv('RECIPE_EXPORT_RATE', default='10/hour'),
+    },
 }
 
 DJOSER = {
@@ -160,3 +248,39 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+EXPORTS_ROOT = os.getenv('EXPORTS_ROOT', default=os.path.join(BASE_DIR, 'exports'))
+EXPORTS_TTL = int(os.getenv('EXPORTS_TTL', default=24 * 60 * 60))
+
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', default=5 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_DIMENSION = int(
+    os.getenv('RECIPE_IMAGE_MAX_DIMENSION', default=6000)
+)
+IMAGE_QUALITY = 80
+
+RECIPE_BULK_MAX_RECORDS = int(
+    os.getenv('RECIPE_BULK_MAX_RECORDS', default=1000)
+)
+RECIPE_BULK_MAX_BODY_SIZE = int(
+    os.getenv('RECIPE_BULK_MAX_BODY_SIZE', default=20 * 1024 * 1024)
+)
+RECIPE_BULK_BATCH_BYTES = int(
+    os.getenv('RECIPE_BULK_BATCH_BYTES', default=4 * 1024 * 1024)
+)
+
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv('FEED_FANOUT_MAX_FOLLOWERS', default=10000)
+)
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', default=100))
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', default=300))
+INGREDIENT_SEARCH_LIMIT = int(
+    os.getenv('INGREDIENT_SEARCH_LIMIT', default=50)
+)
@@ -0,0 +1,3 @@
+def post_worker_init(worker):
+    from api.ingredient_index import ingredient_index
+    ingredient_index.get()
@@ -11,13 +11,14 @@ class RecipeAdmin(ModelAdmin):
     list_filter = ['name', 'author', 'tags']
 
     def in_favorite(self, obj):
-        return models.Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
 
 site.register(models.Tag)
 site.register(models.Recipe, RecipeAdmin)
 site.register(models.RecipeIngredient)
 site.register(models.ShoppingList)
+site.register(models.ShoppingListItem)
 site.register(models.Ingredient)
 site.register(models.Favorite)
 site.register(models.RecipeTag)
@@ -1,5 +1,10 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class RecipesConfig(AppConfig):
     name = 'recipes'
+
+    def ready(self):
+        from recipes.indexes import create_postgres_indexes
+        post_migrate.connect(create_postgres_indexes, sender=self)
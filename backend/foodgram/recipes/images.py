@@ -0,0 +1,83 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from recipes.models import Recipe
+
+RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+RENDITIONS_DIR = 'images/renditions'
+
+
+def rendition_name(image_name, rendition, extension):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{RENDITIONS_DIR}/{stem}_{rendition}.{extension}'
+
+
+def get_renditions(image_name):
+    return {
+        rendition: {
+            extension: default_storage.url(
+                rendition_name(image_name, rendition, extension)
+            )
+            for extension in FORMATS
+        }
+        for rendition in RENDITIONS
+    }
+
+
+def save_rendition(original, image_name, rendition, size):
+    image = original.copy()
+    image.thumbnail(size)
+    for extension, image_format in FORMATS.items():
+        content = BytesIO()
+        image.save(content, image_format, quality=settings.IMAGE_QUALITY)
+        name = rendition_name(image_name, rendition, extension)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(content.getvalue()))
+
+
+def delete_image_files(image_name):
+    if not image_name or Recipe.objects.filter(image=image_name).exists():
+        return
+    default_storage.delete(image_name)
+    for rendition in RENDITIONS:
+        for extension in FORMATS:
+            default_storage.delete(
+                rendition_name(image_name, rendition, extension)
+            )
+
+
+def build_renditions(recipe_id):
+    recipe = Recipe.objects.filter(id=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    image_name = recipe.image.name
+    with default_storage.open(image_name) as file:
+        original = Image.open(file)
+        if max(original.size) > settings.RECIPE_IMAGE_MAX_DIMENSION:
+            raise ValueError(
+                f'Изображение {image_name} больше '
+                f'{settings.RECIPE_IMAGE_MAX_DIMENSION} пикселей'
+            )
+        original.load()
+    if original.mode not in ('RGB', 'L'):
+        original = original.convert('RGB')
+    for rendition, size in RENDITIONS.items():
+        save_rendition(original, image_name, rendition, size)
+    recipe.refresh_from_db(fields=['image'])
+    if recipe.image.name == image_name:
+        recipe.renditions_ready = True
+        recipe.save(update_fields=['renditions_ready', 'updated'])
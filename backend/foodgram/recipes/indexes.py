@@ -0,0 +1,82 @@
+from django.db import connections
+
+SEARCH_INDEXES = (
+    ('recipes_recipe_search_vector_idx', 'search_vector'),
+    ('recipes_recipe_ingredient_ids_idx', 'ingredient_ids'),
+)
+SEARCH_CONFIG = 'russian'
+RECIPE_SEARCH_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION recipes_recipe_search_data() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR NEW.search_vector IS NULL
+            OR NEW.name IS DISTINCT FROM OLD.name
+            OR NEW.text IS DISTINCT FROM OLD.text THEN
+        NEW.search_vector :=
+            setweight(to_tsvector('{SEARCH_CONFIG}', NEW.name), 'A')
+            || setweight(to_tsvector('{SEARCH_CONFIG}', NEW.text), 'B');
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+RECIPE_INGREDIENT_IDS = """
+UPDATE recipes_recipe SET ingredient_ids = ARRAY(
+    SELECT ingredient_id FROM recipes_recipeingredient
+    WHERE recipe_id = recipes_recipe.id ORDER BY ingredient_id
+)
+"""
+INGREDIENTS_CHANGED_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION recipes_recipeingredient_changed() RETURNS trigger
+AS $$
+BEGIN
+    {RECIPE_INGREDIENT_IDS}
+    WHERE id IN (SELECT recipe_id FROM changed);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+INGREDIENTS_TRIGGERS = (
+    ('recipes_recipeingredient_insert', 'INSERT', 'NEW'),
+    ('recipes_recipeingredient_update', 'UPDATE', 'NEW'),
+    ('recipes_recipeingredient_delete', 'DELETE', 'OLD'),
+)
+
+
+def create_search_triggers(cursor):
+    cursor.execute(RECIPE_SEARCH_FUNCTION)
+    cursor.execute(
+        'DROP TRIGGER IF EXISTS recipes_recipe_search_data ON recipes_recipe'
+    )
+    cursor.execute(
+        'CREATE TRIGGER recipes_recipe_search_data '
+        'BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe '
+        'FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_data()'
+    )
+    cursor.execute(INGREDIENTS_CHANGED_FUNCTION)
+    for name, event, table in INGREDIENTS_TRIGGERS:
+        cursor.execute(
+            f'DROP TRIGGER IF EXISTS {name} ON recipes_recipeingredient'
+        )
+        cursor.execute(
+            f'CREATE TRIGGER {name} AFTER {event} '
+            f'ON recipes_recipeingredient REFERENCING {table} TABLE AS '
+            'changed FOR EACH STATEMENT '
+            'EXECUTE FUNCTION recipes_recipeingredient_changed()'
+        )
+    for name, column in SEARCH_INDEXES:
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON recipes_recipe '
+            f'USING gin ({column})'
+        )
+    cursor.execute(
+        'UPDATE recipes_recipe SET name = name WHERE search_vector IS NULL'
+    )
+    cursor.execute(f'{RECIPE_INGREDIENT_IDS} WHERE ingredient_ids IS NULL')
+
+
+def create_postgres_indexes(sender, using, **kwargs):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        create_search_triggers(cursor)
@@ -0,0 +1,144 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.cache import bump_version
+
+READ_SIZE = 64 * 1024
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def iter_json(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n[,]':
+            position += 1
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise
+                return
+            chunk = file.read(READ_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+class CsvStream:
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = ''
+
+    def read(self, size=-1):
+        line = io.StringIO()
+        writer = csv.writer(line)
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            writer.writerow(row)
+            self.buffer += line.getvalue()
+            line.seek(0)
+            line.truncate()
+        if size < 0:
+            size = len(self.buffer)
+        buffer = self.buffer
+        self.buffer = buffer[size:]
+        return buffer[:size]
+
+
+class BulkLoadCommand(BaseCommand):
+    model = None
+    fields = ()
+    default_path = None
+    cache_groups = ()
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=self.default_path)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def read_rows(self, file, path):
+        if path.endswith('.csv'):
+            for row in csv.reader(file):
+                if row:
+                    yield tuple(row)
+            return
+        for item in iter_json(file):
+            yield tuple(item[field] for field in self.fields)
+
+    def copy_rows(self, rows):
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        columns = [
+            connection.ops.quote_name(self.model._meta.get_field(field).column)
+            for field in self.fields
+        ]
+        staging = ', '.join(f'{column} text' for column in columns)
+        columns = ', '.join(columns)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE bulk_load_staging ({staging}) '
+                'ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                f'COPY bulk_load_staging ({columns}) FROM STDIN '
+                'WITH (FORMAT csv)',
+                CsvStream(rows)
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT DISTINCT {columns} FROM bulk_load_staging '
+                'ON CONFLICT DO NOTHING'
+            )
+            cursor.execute('SELECT COUNT(*) FROM bulk_load_staging')
+            return cursor.fetchone()[0]
+
+    def insert_rows(self, rows, batch_size):
+        total = 0
+        for batch in batched(rows, batch_size):
+            self.model.objects.bulk_create(
+                [self.model(**dict(zip(self.fields, row))) for row in batch],
+                ignore_conflicts=True
+            )
+            total += len(batch)
+        return total
+
+    def handle(self, *args, **options):
+        path = options['path']
+        started = time.monotonic()
+        before = self.model.objects.count()
+        with open(path, encoding='utf-8') as file:
+            rows = self.read_rows(file, path)
+            if connection.vendor == 'postgresql':
+                total = self.copy_rows(rows)
+            else:
+                total = self.insert_rows(rows, options['batch_size'])
+        created = self.model.objects.count() - before
+        if created:
+            for group in self.cache_groups:
+                bump_version(group)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.model._meta.verbose_name_plural}: прочитано {total}, '
+            f'добавлено {created} за {elapsed:.2f} с '
+            f'({total / elapsed:.0f} строк/с)'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.management.bulk_load import batched
+from recipes.models import Recipe
+from recipes.tasks import build_renditions
+
+
+class Command(BaseCommand):
+    help = ('Ставит в очередь построение уменьшенных копий изображений '
+            'для рецептов, у которых их ещё нет')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        recipe_ids = list(
+            Recipe.objects.filter(renditions_ready=False).exclude(
+                image=''
+            ).order_by('id').values_list('id', flat=True)
+        )
+        for batch in batched(recipe_ids, options['batch_size']):
+            with transaction.atomic():
+                for recipe_id in batch:
+                    build_renditions.delay(recipe_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'В очередь поставлено рецептов: {len(recipe_ids)}'
+        ))
@@ -0,0 +1,14 @@
+import os
+
+from django.conf import settings
+
+from recipes.management.bulk_load import BulkLoadCommand
+from recipes.models import Ingredient
+
+
+class Command(BulkLoadCommand):
+    help = 'Загружает ингредиенты из CSV или JSON файла'
+    model = Ingredient
+    fields = ('name', 'measurement_unit')
+    cache_groups = ('ingredients', 'recipes')
+    default_path = os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
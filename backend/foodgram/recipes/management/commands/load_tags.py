@@ -0,0 +1,14 @@
+import os
+
+from django.conf import settings
+
+from recipes.management.bulk_load import BulkLoadCommand
+from recipes.models import Tag
+
+
+class Command(BulkLoadCommand):
+    help = 'Загружает теги из CSV или JSON файла'
+    model = Tag
+    fields = ('name', 'color', 'slug')
+    cache_groups = ('tags', 'recipes')
+    default_path = os.path.join(settings.BASE_DIR, 'data', 'tags.json')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.management.bulk_load import batched
+from recipes.models import ShoppingList, ShoppingListItem
+from recipes.shopping_lists import sync_shopping_list_items
+
+
+class Command(BaseCommand):
+    help = ('Проверяет и пересобирает агрегированные списки покупок '
+            'по содержимому корзин')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        user_ids = sorted(
+            set(ShoppingList.objects.values_list('user_id', flat=True))
+            | set(ShoppingListItem.objects.values_list('user_id', flat=True))
+        )
+        drifted = 0
+        for batch in batched(user_ids, options['batch_size']):
+            with transaction.atomic():
+                drifted += sync_shopping_list_items(
+                    batch, check=options['check']
+                )
+        if options['check']:
+            if drifted:
+                raise CommandError(f'Расхождений в списках покупок: {drifted}')
+            self.stdout.write(self.style.SUCCESS('Списки покупок согласованы'))
+            return
+        self.stdout.write(f'Исправлено позиций: {drifted}')
+        self.stdout.write(self.style.SUCCESS('Списки покупок пересобраны'))
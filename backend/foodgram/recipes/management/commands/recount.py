@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Count, F, IntegerField, OuterRef, Subquery, Value,
+)
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingList
+from users.models import Follow, User
+
+
+def count_of(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('id')
+            ).values('total'),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    )
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики избранного, покупок, рецептов и '
+            'подписчиков')
+
+    def recount(self, queryset, field, actual):
+        drifted = queryset.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        ).count()
+        queryset.update(**{field: actual})
+        self.stdout.write(f'{field}: исправлено {drifted}')
+
+    def handle(self, *args, **options):
+        counters = (
+            (Recipe.objects.all(), 'favorites_count',
+             count_of(Favorite, 'recipe')),
+            (Recipe.objects.all(), 'shopping_cart_count',
+             count_of(ShoppingList, 'recipe')),
+            (User.objects.all(), 'recipes_count',
+             count_of(Recipe, 'author')),
+            (User.objects.all(), 'followers_count',
+             count_of(Follow, 'following')),
+        )
+        with transaction.atomic():
+            for queryset, field, actual in counters:
+                self.recount(queryset, field, actual)
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
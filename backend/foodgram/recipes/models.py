@@ -1,3 +1,5 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -13,6 +15,12 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -91,6 +99,10 @@ class RecipeTag(models.Model):
     class Meta:
         verbose_name = 'Тег для рецепта'
         verbose_name_plural = 'Теги для рецептов'
+        indexes = [
+            models.Index(fields=['recipe', 'tag'],
+                         name='recipetag_recipe_tag_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['tag', 'recipe'],
@@ -102,6 +114,30 @@ class RecipeTag(models.Model):
         return f'{self.recipe} содержит тег {self.tag}'
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            no = models.Value(False, output_field=models.BooleanField())
+            return self.annotate(is_favorited=no, is_in_shopping_cart=no)
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+            is_in_shopping_cart=models.Exists(ShoppingList.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+        )
+
+
+class PostgresArrayField(ArrayField):
+
+    def get_placeholder(self, value, compiler, connection):
+        if connection.vendor != 'postgresql':
+            return '%s'
+        return super().get_placeholder(value, compiler, connection)
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -114,6 +150,10 @@ class Recipe(models.Model):
         verbose_name='Изображение',
         upload_to='images/'
     )
+    renditions_ready = models.BooleanField(
+        verbose_name='Уменьшенные копии изображения готовы',
+        default=False
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         verbose_name='Ингредиенты',
@@ -130,11 +170,44 @@ class Recipe(models.Model):
         default=0,
         validators=[MinValueValidator(0)]
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в список покупок',
+        default=0
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата создания',
+        auto_now_add=True
+    )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
+    )
+    ingredient_ids = PostgresArrayField(
+        models.IntegerField(),
+        verbose_name='Идентификаторы ингредиентов',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-id',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=['author', '-id'],
+                         name='recipe_author_id_idx'),
+        ]
 
     def __str__(self):
         return f'рецепт {self.name} от {self.author}'
@@ -191,3 +264,74 @@ class ShoppingList(models.Model):
 
     def __str__(self):
         return f'{self.recipe} в списке покупок у {self.user}'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Владелец списка покупок',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество',
+        default=0
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Число рецептов с ингредиентом',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списке покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_ingredient_in_shopping_list',
+            ),
+        ]
+
+    def __str__(self):
+        return (f'{self.ingredient.name}, {self.total_amount} '
+                f'{self.ingredient.measurement_unit} у {self.user}')
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        verbose_name='Автор рецепта',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        indexes = [
+            models.Index(fields=['user', 'author'],
+                         name='feedentry_user_author_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_recipe_in_feed',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте у {self.user}'
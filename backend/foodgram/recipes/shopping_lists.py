@@ -0,0 +1,53 @@
+from django.db.models import Count, Sum
+
+from recipes.models import RecipeIngredient, ShoppingListItem
+
+
+def get_totals(user_ids, ingredient_ids=None):
+    rows = RecipeIngredient.objects.filter(
+        recipe__shoppinglist__user__in=user_ids
+    )
+    if ingredient_ids is not None:
+        rows = rows.filter(ingredient_id__in=ingredient_ids)
+    return {
+        (row['recipe__shoppinglist__user'], row['ingredient']): (
+            row['total'], row['recipes']
+        )
+        for row in rows.values(
+            'recipe__shoppinglist__user', 'ingredient'
+        ).annotate(
+            total=Sum('amount'), recipes=Count('id')
+        ).order_by()
+    }
+
+
+def sync_shopping_list_items(user_ids, ingredient_ids=None, check=False):
+    actual = get_totals(user_ids, ingredient_ids)
+    items = ShoppingListItem.objects.filter(user_id__in=user_ids)
+    if ingredient_ids is not None:
+        items = items.filter(ingredient_id__in=ingredient_ids)
+    stored = {(item.user_id, item.ingredient_id): item for item in items}
+    stale = [item.id for key, item in stored.items() if key not in actual]
+    changed = []
+    added = []
+    for (user_id, ingredient_id), (total, recipes) in actual.items():
+        item = stored.get((user_id, ingredient_id))
+        if item is None:
+            added.append(ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id,
+                total_amount=total, recipes_count=recipes
+            ))
+        elif (item.total_amount, item.recipes_count) != (total, recipes):
+            item.total_amount = total
+            item.recipes_count = recipes
+            changed.append(item)
+    if not check:
+        if stale:
+            ShoppingListItem.objects.filter(id__in=stale).delete()
+        if changed:
+            ShoppingListItem.objects.bulk_update(
+                changed, ['total_amount', 'recipes_count']
+            )
+        if added:
+            ShoppingListItem.objects.bulk_create(added)
+    return len(stale) + len(changed) + len(added)
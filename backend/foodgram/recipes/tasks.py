@@ -0,0 +1,6 @@
+from recipes import images
+from tasks.registry import task
+
+build_renditions = task(name='recipes.build_renditions')(
+    images.build_renditions
+)
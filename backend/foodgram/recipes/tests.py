@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Ingredient, Recipe, RecipeIngredient, RecipeTag, ShoppingListItem, Tag,
+)
+from tasks.backends import get_backend
+from users.models import User
+
+
+@override_settings(
+    DATABASE_REPLICAS={},
+    TASKS_BACKEND='tasks.backends.ImmediateBackend'
+)
+class ShoppingListConsistencyTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        self.users = [
+            User.objects.create(
+                username=f'user{index}', email=f'user{index}@example.com',
+                first_name='Имя', last_name='Фамилия'
+            )
+            for index in range(3)
+        ]
+        tag = Tag.objects.create(name='Обед', color='#000000', slug='lunch')
+        self.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index}', measurement_unit='г'
+            )
+            for index in range(4)
+        ]
+        self.recipes = []
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                author=self.users[0], name=f'Рецепт {index}', text='Текст',
+                image='images/test.png', cooking_time=10
+            )
+            RecipeTag.objects.create(recipe=recipe, tag=tag)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=10
+                )
+                for ingredient in self.ingredients[index:index + 2]
+            )
+            self.recipes.append(recipe)
+        User.objects.filter(id=self.users[0].id).update(
+            recipes_count=len(self.recipes)
+        )
+
+    def get_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def set_cart(self, user, recipes, method='post'):
+        client = self.get_client(user)
+        for recipe in recipes:
+            response = getattr(client, method)(
+                f'/api/recipes/{recipe.id}/shopping_cart/'
+            )
+            self.assertIn(response.status_code, (201, 204))
+
+    def get_items(self, user):
+        return dict(ShoppingListItem.objects.filter(user=user).values_list(
+            'ingredient__name', 'total_amount'
+        ))
+
+    def assert_consistent(self):
+        call_command('rebuild_shopping_lists', '--check', stdout=StringIO())
+
+    def test_cart_changes_keep_lists_consistent(self):
+        self.set_cart(self.users[1], self.recipes)
+        self.set_cart(self.users[2], self.recipes[:2])
+        self.assert_consistent()
+        self.assertEqual(self.get_items(self.users[1]), {
+            'Ингредиент 0': 10, 'Ингредиент 1': 20,
+            'Ингредиент 2': 20, 'Ингредиент 3': 10,
+        })
+        self.set_cart(self.users[1], self.recipes[1:], method='delete')
+        self.assert_consistent()
+        self.assertEqual(self.get_items(self.users[1]), {
+            'Ингредиент 0': 10, 'Ингредиент 1': 10,
+        })
+
+    def test_ingredient_patch_keeps_lists_consistent(self):
+        self.set_cart(self.users[1], self.recipes[:2])
+        self.set_cart(self.users[2], self.recipes[1:2])
+        first, second, third, fourth = self.ingredients
+        response = self.get_client(self.users[0]).patch(
+            f'/api/recipes/{self.recipes[1].id}/',
+            {'ingredients': [
+                {'id': second.id, 'amount': 30},
+                {'id': fourth.id, 'amount': 5},
+            ]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_consistent()
+        self.assertEqual(self.get_items(self.users[2]), {
+            'Ингредиент 1': 30, 'Ингредиент 3': 5,
+        })
+        self.assertEqual(self.get_items(self.users[1]), {
+            'Ингредиент 0': 10, 'Ингредиент 1': 40, 'Ингредиент 3': 5,
+        })
+
+    def test_recipe_delete_keeps_lists_consistent(self):
+        self.set_cart(self.users[1], self.recipes)
+        response = self.get_client(self.users[0]).delete(
+            f'/api/recipes/{self.recipes[1].id}/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assert_consistent()
+        self.assertEqual(self.get_items(self.users[1]), {
+            'Ингредиент 0': 10, 'Ингредиент 1': 10,
+            'Ингредиент 2': 10, 'Ингредиент 3': 10,
+        })
+
+    def test_check_reports_and_rebuild_fixes_drift(self):
+        self.set_cart(self.users[1], self.recipes)
+        ShoppingListItem.objects.filter(user=self.users[1]).first().delete()
+        with self.assertRaises(CommandError):
+            self.assert_consistent()
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        self.assert_consistent()
@@ -0,0 +1,11 @@
+from django.contrib.admin import ModelAdmin, site
+
+from tasks.models import Task
+
+
+class TaskAdmin(ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'user', 'created']
+    list_filter = ['status', 'name']
+
+
+site.register(Task, TaskAdmin)
@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils.module_loading import import_string
+
+from tasks.runner import run_task
+
+
+class ImmediateBackend:
+    local = threading.local()
+
+    def submit(self, task_id, countdown=0):
+        queue = getattr(self.local, 'queue', None)
+        if queue is not None:
+            queue.append(task_id)
+            return
+        self.local.queue = [task_id]
+        try:
+            while self.local.queue:
+                run_task(self.local.queue.pop(0), inline=True)
+        finally:
+            self.local.queue = None
+
+
+class ThreadPoolBackend:
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.TASKS_WORKERS,
+            thread_name_prefix='tasks'
+        )
+
+    def submit(self, task_id, countdown=0):
+        if countdown:
+            timer = threading.Timer(countdown, self.submit, [task_id])
+            timer.daemon = True
+            timer.start()
+            return
+        self.executor.submit(self.run, task_id)
+
+    def run(self, task_id):
+        try:
+            run_task(task_id)
+        finally:
+            connection.close()
+
+
+class RedisBackend:
+    queue = 'tasks:queue'
+    delayed = 'tasks:delayed'
+
+    def __init__(self):
+        import redis
+        self.client = redis.Redis.from_url(settings.TASKS_BROKER_URL)
+
+    def submit(self, task_id, countdown=0):
+        if countdown:
+            self.client.zadd(
+                self.delayed, {str(task_id): time.time() + countdown}
+            )
+            return
+        self.client.lpush(self.queue, str(task_id))
+
+    def enqueue_due(self):
+        for task_id in self.client.zrangebyscore(self.delayed, 0, time.time()):
+            if self.client.zrem(self.delayed, task_id):
+                self.client.lpush(self.queue, task_id)
+
+    def work(self):
+        while True:
+            self.enqueue_due()
+            item = self.client.brpop(self.queue, timeout=1)
+            if item is None:
+                continue
+            close_old_connections()
+            run_task(item[1].decode())
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.TASKS_BACKEND)()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.backends import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди брокера'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if not hasattr(backend, 'work'):
+            raise CommandError(
+                f'{type(backend).__name__} выполняет задачи внутри '
+                'веб-процесса, отдельный обработчик не нужен'
+            )
+        self.stdout.write('Обработчик задач запущен')
+        backend.work()
@@ -0,0 +1,62 @@
+import uuid
+
+from django.db import models
+
+from users.models import User
+
+
+class Task(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCESS = 'success'
+    FAILURE = 'failure'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (SUCCESS, 'Выполнена'),
+        (FAILURE, 'Ошибка'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(verbose_name='Задача', max_length=200)
+    arguments = models.TextField(verbose_name='Аргументы', default='[]')
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    result = models.TextField(verbose_name='Результат', blank=True)
+    error = models.TextField(verbose_name='Ошибка', blank=True)
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='tasks',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата создания',
+        auto_now_add=True
+    )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(fields=['status', 'updated'],
+                         name='task_status_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
@@ -0,0 +1,43 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+
+from tasks.backends import get_backend
+from tasks.models import Task
+
+registry = {}
+
+
+class TaskFunction:
+
+    def __init__(self, function, name, max_retries, timeout):
+        self.function = function
+        self.name = name
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+    def __call__(self, *args):
+        return self.function(*args)
+
+    def delay(self, *args, user=None):
+        task = Task.objects.create(
+            name=self.name,
+            arguments=json.dumps(args),
+            user=user
+        )
+        transaction.on_commit(lambda: get_backend().submit(task.id))
+        return task
+
+
+def task(name=None, max_retries=None, timeout=None):
+    def decorator(function):
+        task_function = TaskFunction(
+            function,
+            name or f'{function.__module__}.{function.__name__}',
+            settings.TASKS_MAX_RETRIES if max_retries is None else max_retries,
+            settings.TASKS_TIMEOUT if timeout is None else timeout
+        )
+        registry[task_function.name] = task_function
+        return task_function
+    return decorator
@@ -0,0 +1,105 @@
+import json
+import logging
+import signal
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskTimeoutError(Exception):
+    pass
+
+
+def execute_in_thread(function, args, timeout):
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(function(*args))
+        except Exception as error:
+            future.set_exception(error)
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, name='tasks-timeout', daemon=True).start()
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise TaskTimeoutError(f'Задача не завершилась за {timeout} с')
+
+
+def execute(function, args, timeout):
+    if threading.current_thread() is not threading.main_thread():
+        return execute_in_thread(function, args, timeout)
+
+    def expire(signum, frame):
+        raise TaskTimeoutError(f'Задача не завершилась за {timeout} с')
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return function(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def set_status(tasks, status, **fields):
+    tasks.update(status=status, updated=timezone.now(), **fields)
+
+
+def run_task(task_id, inline=False):
+    from tasks.backends import get_backend
+    from tasks.registry import registry
+
+    task = Task.objects.filter(id=task_id).first()
+    if task is None or task.status not in (Task.PENDING, Task.RUNNING):
+        return
+    tasks = Task.objects.filter(id=task_id)
+    task_function = registry.get(task.name)
+    if task_function is None:
+        set_status(tasks, Task.FAILURE, error='Неизвестная задача')
+        return
+    set_status(tasks, Task.RUNNING, attempts=F('attempts') + 1)
+    attempts = task.attempts + 1
+    args = json.loads(task.arguments)
+    try:
+        if inline:
+            result = task_function.function(*args)
+        else:
+            result = execute(task_function.function, args,
+                             task_function.timeout)
+    except TaskTimeoutError as error:
+        logger.error('Задача %s (%s) прервана: %s', task.name, task_id, error)
+        set_status(tasks, Task.FAILURE, error=repr(error))
+        return
+    except Exception as error:
+        logger.exception('Задача %s (%s) завершилась ошибкой',
+                         task.name, task_id)
+        if attempts <= task_function.max_retries:
+            set_status(tasks, Task.PENDING, error=repr(error))
+            get_backend().submit(
+                task_id,
+                countdown=settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1)
+            )
+        else:
+            set_status(tasks, Task.FAILURE, error=repr(error))
+        return
+    set_status(tasks, Task.SUCCESS, result=json.dumps(result), error='')
+
+
+def delete_expired_tasks():
+    return Task.objects.filter(
+        status__in=(Task.SUCCESS, Task.FAILURE),
+        updated__lt=timezone.now() - timedelta(seconds=settings.TASKS_TTL)
+    ).delete()[0]
@@ -4,6 +4,14 @@ from django.db import models
 
 class User(AbstractUser):
     REQUIRED_FIELDS = ('email', 'first_name', 'last_name',)
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -32,6 +40,10 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        indexes = [
+            models.Index(fields=['follower', 'following'],
+                         name='follow_follower_following_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(fields=['following', 'follower'],
                                     name='unique_following',),